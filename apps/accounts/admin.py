@@ -4,16 +4,131 @@ Custom Django admin configuration for user management
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.admin.views.main import ORDER_VAR
 from django.utils.html import format_html
 from django.urls import reverse
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
-from django.db.models import Count, Q
+from django.db.models import (
+    Count, Q, OuterRef, Subquery, F, ExpressionWrapper, DurationField,
+    Case, When, Value, IntegerField
+)
+from django.db.models.functions import Coalesce, Now
 from django.utils import timezone
 from datetime import timedelta
 
 from apps.accounts.models import User, UserProfile, UserSession, UserAlert, UserNotification
 
 
+# Constant list_display cells, built once instead of per row
+_PROFILE_COMPLETE = mark_safe('<span style="color: green;">✓ Complete</span>')
+_PROFILE_ONBOARDING_PENDING = mark_safe('<span style="color: orange;">⚠ Onboarding pending</span>')
+_PROFILE_INCOMPLETE = mark_safe('<span style="color: red;">✗ Incomplete</span>')
+_LAST_LOGIN_NEVER = mark_safe('<span style="color: gray;">Never</span>')
+_READ = mark_safe('<span style="color: green;">✓ Read</span>')
+_UNREAD = mark_safe('<span style="color: red;">✗ Unread</span>')
+
+# (days since last login, color) checked in order for logins a day or more ago
+_AGE_BUCKETS = ((30, 'red'), (7, 'orange'), (0, 'blue'))
+
+# Permission flags packed into the perm_mask annotation, in display order
+PERM_BITS = (
+    ('can_access_analytics', 1),
+    ('can_export_data', 2),
+    ('can_manage_alerts', 4),
+    ('api_access_enabled', 8),
+    ('is_staff', 16),
+    ('is_superuser', 32),
+)
+
+
+def _perm_icons(mask):
+    """Render the permission icons for one bitmask value"""
+    perms = []
+    if mask & 1:
+        perms.append('📊')
+    if mask & 2:
+        perms.append('💾')
+    if mask & 4:
+        perms.append('🚨')
+    if mask & 8:
+        perms.append('🔗')
+    if mask & 32:
+        perms.append('👑')
+    elif mask & 16:
+        perms.append('🔧')
+    return ' '.join(perms) if perms else '👤'
+
+
+PERM_ICON_TABLE = tuple(_perm_icons(mask) for mask in range(64))
+
+
+def perm_mask_expression():
+    """Single integer column encoding all PERM_BITS flags"""
+    expression = Value(0)
+    for field_name, bit in PERM_BITS:
+        expression = expression + Case(
+            When(**{field_name: True}, then=Value(bit)),
+            default=Value(0)
+        )
+    return ExpressionWrapper(expression, output_field=IntegerField())
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that counts on a stripped-down queryset and caches the
+    unfiltered total for a short time
+    """
+    cache_timeout = 30
+    
+    @cached_property
+    def count(self):
+        """Count without joins, ordering or annotations"""
+        queryset = self.object_list.values('pk').order_by()
+        queryset.query.select_related = False
+        
+        if queryset.query.where:
+            return queryset.count()
+        
+        cache_key = f'admin:{queryset.model._meta.db_table}:count'
+        total = cache.get(cache_key)
+        if total is None:
+            total = queryset.count()
+            cache.set(cache_key, total, timeout=self.cache_timeout)
+        return total
+
+
+class ChangelistProjectionMixin:
+    """
+    Load only changelist_only_fields on list pages while the change form
+    still gets full rows
+    """
+    changelist_only_fields = ()
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.changelist_only_fields:
+            queryset = queryset.only(*self.changelist_only_fields)
+        return queryset
+    
+    def get_object_queryset(self, request):
+        """Queryset used to load a single object for the change form"""
+        return self.get_queryset(request).defer(None)
+    
+    def get_object(self, request, object_id, from_field=None):
+        queryset = self.get_object_queryset(request)
+        model = queryset.model
+        field = model._meta.pk if from_field is None else model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+            return queryset.get(**{field.name: object_id})
+        except (model.DoesNotExist, ValidationError, ValueError):
+            return None
+
+
 class UserProfileInline(admin.StackedInline):
     """Inline for UserProfile in User admin"""
     model = UserProfile
@@ -34,9 +149,13 @@ class UserProfileInline(admin.StackedInline):
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ChangelistProjectionMixin, BaseUserAdmin):
     """Enhanced User admin with trading-specific features"""
     
+    # Skip the unfiltered COUNT(*) and serve the paginator count from cache
+    show_full_result_count = False
+    paginator = CachedCountPaginator
+    
     inlines = (UserProfileInline,)
     
     # List display
@@ -66,13 +185,14 @@ class UserAdmin(BaseUserAdmin):
         'last_login',
     )
     
+    # Prefix lookups can use a btree index; full_name also goes through trigram search
     search_fields = (
-        'username',
-        'email',
-        'full_name',
-        'first_name',
-        'last_name',
-        'company',
+        '^username',
+        '^email',
+        '^full_name',
+        '^first_name',
+        '^last_name',
+        '^company',
     )
     
     ordering = ('-date_joined',)
@@ -152,52 +272,76 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
-    filter_horizontal = ('groups', 'user_permissions', 'preferred_stocks', 'preferred_industries')
+    # Autocomplete fetches options on demand instead of rendering every row
+    autocomplete_fields = ('preferred_stocks', 'preferred_industries', 'groups')
+    filter_horizontal = ('user_permissions',)
+    
+    list_select_related = ('profile',)
+    
+    # Columns read by list_display; everything else stays deferred on the changelist
+    changelist_only_fields = (
+        'id',
+        'username',
+        'email',
+        'full_name',
+        'company',
+        'is_active',
+        'profile_completed',
+        'onboarding_completed',
+        'last_login',
+        'login_count',
+        'profile__id',
+        'profile__user_id',
+    )
     
     def get_queryset(self, request):
         """Optimize queryset with related data"""
-        return super().get_queryset(request).select_related(
+        queryset = super().get_queryset(request).select_related(
             'profile'
-        ).prefetch_related(
-            'alerts',
-            'sessions',
+        ).annotate(
+            perm_mask=perm_mask_expression()
+        )
+        
+        # Correlated subquery keeps one row per user; joining the reverse
+        # relation for Count() multiplies rows before grouping.
+        alerts_sq = UserAlert.objects.filter(
+            user=OuterRef('pk')
+        ).order_by().values('user').annotate(c=Count('pk')).values('c')
+        return queryset.annotate(alert_count=Coalesce(Subquery(alerts_sq), 0))
+    
+    def get_object_queryset(self, request):
+        """Load the full row and M2M selections for the change form"""
+        return super().get_object_queryset(request).prefetch_related(
             'preferred_stocks',
             'preferred_industries'
-        ).annotate(
-            alert_count=Count('alerts'),
-            session_count=Count('sessions')
         )
     
+    def get_search_results(self, request, queryset, search_term):
+        """Prefix search on search_fields, plus trigram similarity on full_name"""
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if len(term) >= 3:
+            # Trigram needs pg_trgm (core migration 0007_pg_trgm_extension)
+            results |= queryset.filter(full_name__trigram_similar=term)
+        return results, may_have_duplicates
+    
     def profile_status(self, obj):
         """Display profile completion status"""
         if obj.profile_completed and obj.onboarding_completed:
-            return format_html(
-                '<span style="color: green;">✓ Complete</span>'
-            )
+            return _PROFILE_COMPLETE
         elif obj.profile_completed:
-            return format_html(
-                '<span style="color: orange;">⚠ Onboarding pending</span>'
-            )
+            return _PROFILE_ONBOARDING_PENDING
         else:
-            return format_html(
-                '<span style="color: red;">✗ Incomplete</span>'
-            )
+            return _PROFILE_INCOMPLETE
     profile_status.short_description = 'Profile Status'
     
     def last_login_display(self, obj):
         """Enhanced last login display"""
         if obj.last_login:
-            now = timezone.now()
-            diff = now - obj.last_login
+            diff = timezone.now() - obj.last_login
             
-            if diff.days > 30:
-                color = 'red'
-                status = f'{diff.days} days ago'
-            elif diff.days > 7:
-                color = 'orange'
-                status = f'{diff.days} days ago'
-            elif diff.days > 0:
-                color = 'blue'
+            if diff.days > 0:
+                color = next(color for days, color in _AGE_BUCKETS if diff.days > days)
                 status = f'{diff.days} days ago'
             else:
                 color = 'green'
@@ -213,32 +357,18 @@ class UserAdmin(BaseUserAdmin):
                 color,
                 status
             )
-        return format_html('<span style="color: gray;">Never</span>')
+        return _LAST_LOGIN_NEVER
     last_login_display.short_description = 'Last Login'
     
     def alert_count(self, obj):
-        """Display number of active alerts"""
+        """Display number of alerts"""
         return obj.alert_count
     alert_count.short_description = 'Alerts'
     alert_count.admin_order_field = 'alert_count'
     
     def permissions_summary(self, obj):
         """Summary of user permissions"""
-        perms = []
-        if obj.can_access_analytics:
-            perms.append('📊')
-        if obj.can_export_data:
-            perms.append('💾')
-        if obj.can_manage_alerts:
-            perms.append('🚨')
-        if obj.api_access_enabled:
-            perms.append('🔗')
-        if obj.is_superuser:
-            perms.append('👑')
-        elif obj.is_staff:
-            perms.append('🔧')
-        
-        return ' '.join(perms) if perms else '👤'
+        return PERM_ICON_TABLE[obj.perm_mask]
     permissions_summary.short_description = 'Permissions'
     
     # Custom actions
@@ -273,6 +403,10 @@ class UserAdmin(BaseUserAdmin):
 class UserSessionAdmin(admin.ModelAdmin):
     """Admin for user sessions"""
     
+    # Skip the unfiltered COUNT(*) and serve the paginator count from cache
+    show_full_result_count = False
+    paginator = CachedCountPaginator
+    
     list_display = (
         'user',
         'login_time',
@@ -306,12 +440,17 @@ class UserSessionAdmin(admin.ModelAdmin):
     ordering = ('-login_time',)
     
     def get_queryset(self, request):
-        """Optimize queryset"""
-        return super().get_queryset(request).select_related('user')
+        """Optimize queryset and compute session duration in the database"""
+        return super().get_queryset(request).select_related('user').annotate(
+            _duration=ExpressionWrapper(
+                Coalesce(F('logout_time'), Now()) - F('login_time'),
+                output_field=DurationField()
+            )
+        )
     
     def duration_display(self, obj):
         """Display session duration"""
-        duration = obj.duration()
+        duration = obj._duration
         hours, remainder = divmod(duration.total_seconds(), 3600)
         minutes, _ = divmod(remainder, 60)
         
@@ -320,6 +459,7 @@ class UserSessionAdmin(admin.ModelAdmin):
         else:
             return f'{int(minutes)}m'
     duration_display.short_description = 'Duration'
+    duration_display.admin_order_field = '_duration'
     
     def activity_summary(self, obj):
         """Display activity summary"""
@@ -328,9 +468,13 @@ class UserSessionAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserAlert)
-class UserAlertAdmin(admin.ModelAdmin):
+class UserAlertAdmin(ChangelistProjectionMixin, admin.ModelAdmin):
     """Admin for user alerts"""
     
+    # Skip the unfiltered COUNT(*) and serve the paginator count from cache
+    show_full_result_count = False
+    paginator = CachedCountPaginator
+    
     list_display = (
         'name',
         'user',
@@ -362,7 +506,8 @@ class UserAlertAdmin(admin.ModelAdmin):
         'updated_at'
     )
     
-    filter_horizontal = ('target_stocks', 'target_industries')
+    autocomplete_fields = ('user', 'target_stocks', 'target_industries')
+    list_select_related = ('user',)
     
     fieldsets = (
         (None, {
@@ -383,15 +528,28 @@ class UserAlertAdmin(admin.ModelAdmin):
         }),
     )
     
-    def get_queryset(self, request):
-        """Optimize queryset"""
-        return super().get_queryset(request).select_related('user')
+    changelist_only_fields = (
+        'id',
+        'name',
+        'alert_type',
+        'is_active',
+        'trigger_count',
+        'last_triggered',
+        'frequency_limit',
+        'user__id',
+        'user__username',
+        'user__full_name',
+    )
 
 
 @admin.register(UserNotification)
 class UserNotificationAdmin(admin.ModelAdmin):
     """Admin interface for user notifications"""
     
+    # Skip the unfiltered COUNT(*) and serve the paginator count from cache
+    show_full_result_count = False
+    paginator = CachedCountPaginator
+    
     list_display = [
         'title',
         'user',
@@ -446,14 +604,7 @@ class UserNotificationAdmin(admin.ModelAdmin):
     
     def read_status(self, obj):
         """Display read status with icon"""
-        if obj.is_read:
-            return format_html(
-                '<span style="color: green;">✓ Read</span>'
-            )
-        else:
-            return format_html(
-                '<span style="color: red;">✗ Unread</span>'
-            )
+        return _READ if obj.is_read else _UNREAD
     read_status.short_description = 'Status'  # type: ignore
     
     actions = ['mark_as_read', 'mark_as_unread']
@@ -462,7 +613,7 @@ class UserNotificationAdmin(admin.ModelAdmin):
         """Mark selected notifications as read"""
         updated = queryset.filter(is_read=False).update(
             is_read=True,
-            read_at=timezone.now()
+            read_at=Now()
         )
         self.message_user(request, f'{updated} notifications marked as read.')
     mark_as_read.short_description = "Mark selected notifications as read"  # type: ignore
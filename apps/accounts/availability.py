@@ -0,0 +1,92 @@
+"""
+Username/email availability lookups
+
+Taken usernames and emails are kept in Redis sets so the signup form's
+per-keystroke availability checks can reject taken values without a
+database query. The sets only ever answer "taken": a miss falls back
+to the database, and a database hit is added to the set.
+"""
+
+import logging
+
+import redis
+
+from apps.accounts.heartbeat import get_redis
+from apps.accounts.models import User
+
+logger = logging.getLogger(__name__)
+
+TAKEN_USERNAMES_KEY = 'users:usernames'
+TAKEN_EMAILS_KEY = 'users:emails'
+
+
+def _is_member(key, value):
+    try:
+        return bool(get_redis().sismember(key, value))
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache unavailable: {e}")
+        return False
+
+
+def _add(key, value):
+    try:
+        get_redis().sadd(key, value)
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache unavailable: {e}")
+
+
+def is_username_taken(username):
+    """Check whether a username is registered (usernames are case-sensitive)"""
+    if not username:
+        return False
+    if _is_member(TAKEN_USERNAMES_KEY, username):
+        return True
+    if User.objects.filter(username=username).exists():
+        _add(TAKEN_USERNAMES_KEY, username)
+        return True
+    return False
+
+
+def is_email_taken(email):
+    """Check whether an email is registered, ignoring case like the unique constraint"""
+    email = email.strip().lower()
+    if not email:
+        return False
+    if _is_member(TAKEN_EMAILS_KEY, email):
+        return True
+    if User.objects.filter(email__iexact=email).exclude(email='').exists():
+        _add(TAKEN_EMAILS_KEY, email)
+        return True
+    return False
+
+
+def remember_user(user):
+    """Mark a saved user's username and email as taken, releasing the ones it was loaded with"""
+    old_username, old_email = getattr(user, '_loaded_identifiers', (None, None))
+    email = user.email.lower() if user.email else ''
+    try:
+        pipe = get_redis().pipeline()
+        if old_username and old_username != user.username:
+            pipe.srem(TAKEN_USERNAMES_KEY, old_username)
+        if old_email and old_email.lower() != email:
+            pipe.srem(TAKEN_EMAILS_KEY, old_email.lower())
+        pipe.sadd(TAKEN_USERNAMES_KEY, user.username)
+        if email:
+            pipe.sadd(TAKEN_EMAILS_KEY, email)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache unavailable: {e}")
+        return
+    user._loaded_identifiers = (user.username, user.email)
+
+
+def forget_user(user):
+    """Release a deleted user's username and email"""
+    try:
+        pipe = get_redis().pipeline()
+        pipe.srem(TAKEN_USERNAMES_KEY, user.username)
+        if user.email:
+            pipe.srem(TAKEN_EMAILS_KEY, user.email.lower())
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache unavailable: {e}")
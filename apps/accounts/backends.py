@@ -0,0 +1,42 @@
+"""
+Authentication backends for GPW2 Trading Intelligence Platform
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, Q, Value, When
+
+
+class EmailOrUsernameModelBackend(ModelBackend):
+    """
+    Authenticate with either username or email address in a single lookup
+    """
+    
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        
+        username_match = Q(**{UserModel.USERNAME_FIELD: username})
+        users = UserModel._default_manager.filter(username_match)
+        if '@' in username:
+            # A username containing '@' can also be another user's email:
+            # prefer the exact username, then the oldest account with that email
+            users = UserModel._default_manager.filter(
+                username_match | Q(email__iexact=username)
+            ).order_by(
+                Case(When(username_match, then=Value(0)), default=Value(1)), 'pk'
+            )
+        
+        user = users.first()
+        if user is None:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user
+            UserModel().set_password(password)
+            return None
+        
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -3,15 +3,107 @@ Authentication forms for GPW2 Trading Intelligence Platform
 """
 
 from django import forms
+from django.forms.fields import CallableChoiceIterator
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import authenticate
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.core.cache import cache
 from apps.accounts.models import User, UserProfile
 from apps.core.models import StockSymbol, Industry
 
 
+TIMEZONE_CHOICES = (
+    ('Europe/Warsaw', 'Warsaw (CET/CEST)'),
+    ('UTC', 'UTC'),
+    ('Europe/London', 'London (GMT/BST)'),
+    ('America/New_York', 'New York (EST/EDT)'),
+    ('Asia/Tokyo', 'Tokyo (JST)'),
+)
+
+
+STOCK_CHOICES_VERSION_KEY = 'stocksymbol:version'
+INDUSTRY_CHOICES_VERSION_KEY = 'industry:version'
+ONBOARDING_CHOICES_CACHE_TIMEOUT = 300  # 5 minutes
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def bump_stock_choices_version():
+    """Invalidate cached stock choice lists"""
+    _bump_version(STOCK_CHOICES_VERSION_KEY)
+
+
+def bump_industry_choices_version():
+    """Invalidate cached industry choice lists"""
+    _bump_version(INDUSTRY_CHOICES_VERSION_KEY)
+
+
+class StockMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    Stock multi-select whose (pk, label) list is cached between requests
+    """
+    cache_timeout = 300  # 5 minutes
+    
+    def label_from_instance(self, obj):
+        return f"{obj.symbol} - {obj.name}"
+    
+    def _load_choices(self):
+        version = cache.get_or_set(STOCK_CHOICES_VERSION_KEY, 1, timeout=None)
+        cache_key = f'accounts:stock_choices:{version}'
+        choices = cache.get(cache_key)
+        if choices is None:
+            choices = [(obj.pk, self.label_from_instance(obj)) for obj in self.queryset]
+            cache.set(cache_key, choices, timeout=self.cache_timeout)
+        return choices
+    
+    def _get_choices(self):
+        if hasattr(self, '_choices'):
+            return self._choices
+        # Resolved on iteration so no query runs at import/form construction
+        return CallableChoiceIterator(self._load_choices)
+    
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+
+def get_onboarding_stock_choices():
+    """Top 20 monitored stocks offered during onboarding (cached until stocks change)"""
+    version = cache.get_or_set(STOCK_CHOICES_VERSION_KEY, 1, timeout=None)
+    cache_key = f'accounts:onboarding_stock_choices:{version}'
+    choices = cache.get(cache_key)
+    if choices is None:
+        choices = [
+            (row['pk'], f"{row['symbol']} - {row['name']}")
+            for row in StockSymbol.active.filter(is_monitored=True).values('pk', 'symbol', 'name')[:20]
+        ]
+        cache.set(cache_key, choices, timeout=ONBOARDING_CHOICES_CACHE_TIMEOUT)
+    return choices
+
+
+def get_onboarding_industry_choices():
+    """Top 10 industries offered during onboarding (cached until industries change)"""
+    version = cache.get_or_set(INDUSTRY_CHOICES_VERSION_KEY, 1, timeout=None)
+    cache_key = f'accounts:onboarding_industry_choices:{version}'
+    choices = cache.get(cache_key)
+    if choices is None:
+        choices = [
+            (row['pk'], f"{row['parent_industry__name']} > {row['name']}" if row['parent_industry__name'] else row['name'])
+            for row in Industry.objects.values('pk', 'name', 'parent_industry__name')[:10]
+        ]
+        cache.set(cache_key, choices, timeout=ONBOARDING_CHOICES_CACHE_TIMEOUT)
+    return choices
+
+
 class CustomLoginForm(AuthenticationForm):
-    """Enhanced login form with better styling"""
+    """
+    Enhanced login form with better styling
+    Email logins are resolved by EmailOrUsernameModelBackend
+    """
     
     username = forms.CharField(
         widget=forms.TextInput(attrs={
@@ -34,20 +126,6 @@ class CustomLoginForm(AuthenticationForm):
             'class': 'form-check-input'
         })
     )
-    
-    def clean_username(self):
-        """Allow login with email or username"""
-        username = self.cleaned_data.get('username')
-        
-        if username and '@' in username:
-            # Try to find user by email
-            try:
-                user = User.objects.get(email=username)
-                return user.username
-            except User.DoesNotExist:
-                pass
-        
-        return username
 
 
 class CustomRegistrationForm(UserCreationForm):
@@ -122,7 +200,7 @@ class CustomRegistrationForm(UserCreationForm):
     def clean_email(self):
         """Ensure email is unique"""
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        if User.objects.filter(email__iexact=email).exclude(email='').only('pk').exists():
             raise ValidationError('A user with this email already exists.')
         return email
     
@@ -169,8 +247,8 @@ class UserProfileForm(forms.ModelForm):
 class UserPreferencesForm(forms.ModelForm):
     """Form for editing user preferences and settings"""
     
-    preferred_stocks = forms.ModelMultipleChoiceField(
-        queryset=StockSymbol.active.all(),
+    preferred_stocks = StockMultipleChoiceField(
+        queryset=StockSymbol.active.only('pk', 'symbol', 'name').order_by('symbol'),
         required=False,
         widget=forms.SelectMultiple(attrs={
             'class': 'form-select',
@@ -191,6 +269,12 @@ class UserPreferencesForm(forms.ModelForm):
         help_text="Select industries you're interested in"
     )
     
+    timezone_preference = forms.ChoiceField(
+        choices=TIMEZONE_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        help_text="User's preferred timezone"
+    )
+    
     class Meta:
         model = User
         fields = [
@@ -229,21 +313,7 @@ class UserPreferencesForm(forms.ModelForm):
                 'min': '1',
                 'max': '365'
             }),
-            'timezone_preference': forms.Select(attrs={'class': 'form-select'}),
         }
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        
-        # Add timezone choices
-        timezone_choices = [
-            ('Europe/Warsaw', 'Warsaw (CET/CEST)'),
-            ('UTC', 'UTC'),
-            ('Europe/London', 'London (GMT/BST)'),
-            ('America/New_York', 'New York (EST/EDT)'),
-            ('Asia/Tokyo', 'Tokyo (JST)'),
-        ]
-        self.fields['timezone_preference'].choices = timezone_choices
 
 
 class PasswordChangeForm(forms.Form):
@@ -301,7 +371,7 @@ class PasswordChangeForm(forms.Form):
         """Save new password"""
         password = self.cleaned_data['new_password1']
         self.user.set_password(password)
-        self.user.save()
+        self.user.save(update_fields=['password'])
         return self.user
 
 
@@ -347,14 +417,16 @@ class OnboardingForm(forms.Form):
     )
     
     # Step 2: Interests
-    interested_stocks = forms.ModelMultipleChoiceField(
-        queryset=StockSymbol.active.filter(is_monitored=True)[:20],  # Top 20 stocks
+    interested_stocks = forms.TypedMultipleChoiceField(
+        choices=get_onboarding_stock_choices,  # Top 20 stocks
+        coerce=int,
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
     )
     
-    interested_industries = forms.ModelMultipleChoiceField(
-        queryset=Industry.objects.all()[:10],  # Top 10 industries
+    interested_industries = forms.TypedMultipleChoiceField(
+        choices=get_onboarding_industry_choices,  # Top 10 industries
+        coerce=int,
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
     )
@@ -374,7 +446,7 @@ class OnboardingForm(forms.Form):
         """Apply onboarding preferences to user"""
         cleaned_data = self.cleaned_data
         
-        # Update user preferences
+        # Update user preferences (choices are already primary keys)
         user.preferred_stocks.set(cleaned_data.get('interested_stocks', []))
         user.preferred_industries.set(cleaned_data.get('interested_industries', []))
         
@@ -383,19 +455,32 @@ class OnboardingForm(forms.Form):
         user.email_notifications = 'email' in notification_prefs
         
         # Update profile
-        if hasattr(user, 'profile'):
-            profile = user.profile
-            if cleaned_data.get('experience_years') is not None:
-                profile.experience_years = cleaned_data['experience_years']
-            if cleaned_data.get('investment_focus'):
-                profile.investment_focus = cleaned_data['investment_focus']
-            if cleaned_data.get('risk_tolerance'):
-                profile.risk_tolerance = cleaned_data['risk_tolerance']
-            profile.save()
+        profile_updates = {}
+        if cleaned_data.get('experience_years') is not None:
+            profile_updates['experience_years'] = cleaned_data['experience_years']
+        if cleaned_data.get('investment_focus'):
+            profile_updates['investment_focus'] = cleaned_data['investment_focus']
+        if cleaned_data.get('risk_tolerance'):
+            profile_updates['risk_tolerance'] = cleaned_data['risk_tolerance']
+        if profile_updates:
+            updated = UserProfile.objects.filter(user=user).update(
+                updated_at=timezone.now(),
+                **profile_updates
+            )
+            if not updated:
+                # Profile creation task has not run yet
+                UserProfile.objects.update_or_create(user=user, defaults=profile_updates)
+            User.invalidate_profile_completion(user.pk)
         
         # Mark onboarding as completed
         user.onboarding_completed = True
         user.profile_completed = True
-        user.save()
+        User.objects.filter(pk=user.pk).update(
+            email_notifications=user.email_notifications,
+            onboarding_completed=True,
+            profile_completed=True
+        )
+        # update() bypasses post_save, so drop the cached alert settings here
+        User.invalidate_alert_settings(user.pk)
         
         return user
@@ -0,0 +1,73 @@
+"""
+Session activity heartbeat
+
+Requests record the session's last activity in a Redis sorted set
+(score = unix timestamp) instead of issuing an UPDATE per request.
+flush_session_activity() moves settled entries into
+UserSession.last_activity in bulk; it is run periodically by
+apps.accounts.tasks.flush_session_activity_task.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+
+from apps.accounts.models import UserSession
+
+logger = logging.getLogger(__name__)
+
+SESSION_ACTIVITY_KEY = 'user_session_activity'
+
+_client = None
+
+
+def get_redis():
+    """Shared Redis client for the heartbeat set"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def touch(session_key):
+    """Record activity for a session key"""
+    if not session_key:
+        return
+    try:
+        get_redis().zadd(SESSION_ACTIVITY_KEY, {session_key: time.time()})
+    except redis.RedisError as e:
+        logger.warning(f"Session heartbeat failed: {e}")
+
+
+def flush_session_activity(settle_seconds=30, batch_size=500):
+    """
+    Write heartbeats older than settle_seconds to UserSession.last_activity
+    
+    Returns the number of sessions updated.
+    """
+    cutoff = time.time() - settle_seconds
+    
+    # Read and remove in one MULTI so heartbeats arriving meanwhile are kept
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.zrangebyscore(SESSION_ACTIVITY_KEY, '-inf', cutoff, withscores=True)
+    pipe.zremrangebyscore(SESSION_ACTIVITY_KEY, '-inf', cutoff)
+    entries, _ = pipe.execute()
+    if not entries:
+        return 0
+    
+    last_seen = {
+        key.decode(): datetime.fromtimestamp(score, tz=dt_timezone.utc)
+        for key, score in entries
+    }
+    
+    sessions = list(
+        UserSession.objects.filter(session_key__in=last_seen).only('id', 'session_key')
+    )
+    for session in sessions:
+        session.last_activity = last_seen[session.session_key]
+    
+    UserSession.objects.bulk_update(sessions, ['last_activity'], batch_size=batch_size)
+    return len(sessions)
@@ -0,0 +1,147 @@
+"""
+Middleware for user account tracking
+
+Add 'apps.accounts.middleware.LoginTrackingMiddleware' to MIDDLEWARE after
+AuthenticationMiddleware to batch login bookkeeping until the response is ready.
+SessionActivityMiddleware records session activity through the Redis heartbeat;
+settings adds it, with a 60 s beat entry for
+apps.accounts.tasks.flush_session_activity_task, when the accounts app is
+installed. Without them last_activity only moves when the session row is saved.
+Add 'apps.accounts.middleware.ClientIPMiddleware' near the top of MIDDLEWARE so
+request.client_ip is parsed once and reused by get_client_ip().
+"""
+
+import threading
+
+from django.db import transaction
+from django.db.models import Case, F, GenericIPAddressField, IntegerField, Value, When
+
+from apps.accounts.heartbeat import touch
+from apps.accounts.models import User, UserSession
+
+_state = threading.local()
+
+
+def _parse_client_ip(request):
+    """First X-Forwarded-For hop, falling back to REMOTE_ADDR"""
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '').partition(',')[0].strip()
+    return forwarded or request.META.get('REMOTE_ADDR')
+
+
+def get_client_ip(request):
+    """Get client IP address, parsed once per request by ClientIPMiddleware"""
+    return getattr(request, 'client_ip', None) or _parse_client_ip(request)
+
+
+def record_login(user, session_key, ip_address, user_agent):
+    """
+    Queue login bookkeeping for the current request, or write it
+    straight away when LoginTrackingMiddleware is not active
+    """
+    entry = (user.pk, session_key, ip_address, user_agent)
+    pending = getattr(_state, 'pending_logins', None)
+    if pending is None:
+        flush_logins([entry])
+    else:
+        pending.append(entry)
+
+
+def flush_logins(entries):
+    """Write queued logins with one statement per table operation"""
+    if not entries:
+        return
+    
+    logins_per_user = {}
+    ip_per_user = {}
+    sessions = {}
+    for user_id, session_key, ip_address, user_agent in entries:
+        logins_per_user[user_id] = logins_per_user.get(user_id, 0) + 1
+        if ip_address:
+            ip_per_user[user_id] = ip_address
+        if session_key:
+            # Last write wins if the same session key was queued twice
+            sessions[session_key] = UserSession(
+                session_key=session_key,
+                user_id=user_id,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                is_active=True
+            )
+    
+    # Session rows are written before the response, so a logout always finds them
+    with transaction.atomic():
+        updates = {
+            'login_count': F('login_count') + Case(
+                *[When(pk=user_id, then=Value(count)) for user_id, count in logins_per_user.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        }
+        if ip_per_user:
+            updates['last_login_ip'] = Case(
+                *[When(pk=user_id, then=Value(ip)) for user_id, ip in ip_per_user.items()],
+                default=F('last_login_ip'),
+                output_field=GenericIPAddressField()
+            )
+        User.objects.filter(pk__in=logins_per_user).update(**updates)
+        
+        if sessions:
+            # Close any other active sessions for these users
+            UserSession.objects.filter(
+                user_id__in={session.user_id for session in sessions.values()},
+                is_active=True
+            ).exclude(
+                session_key__in=sessions
+            ).update(is_active=False)
+            
+            UserSession.objects.bulk_create(
+                sessions.values(),
+                update_conflicts=True,
+                unique_fields=['session_key'],
+                update_fields=['user', 'ip_address', 'user_agent', 'is_active', 'last_activity']
+            )
+    
+    if sessions:
+        UserSession.invalidate_session_count(*{session.user_id for session in sessions.values()})
+
+
+class LoginTrackingMiddleware:
+    """Collect login tracking during a request and flush it once at the end"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        _state.pending_logins = []
+        try:
+            response = self.get_response(request)
+        finally:
+            pending = _state.pending_logins
+            _state.pending_logins = None
+        
+        flush_logins(pending)
+        return response
+
+
+class SessionActivityMiddleware:
+    """Heartbeat the current session in Redis instead of updating UserSession"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.user.is_authenticated:
+            touch(request.session.session_key)
+        return response
+
+
+class ClientIPMiddleware:
+    """Parse the client IP once and store it as request.client_ip"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        request.client_ip = _parse_client_ip(request)
+        return self.get_response(request)
@@ -4,10 +4,51 @@ Extends Django's AbstractUser with trading-specific fields
 """
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import F, Prefetch
+from django.db.models.functions import Now, Upper
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from apps.core.models import TimeStampedModel
+from copy import deepcopy
+import uuid
+
+
+ALERT_SETTINGS_CACHE_KEY = 'user:{pk}:alert_settings'
+ALERT_SETTINGS_CACHE_TIMEOUT = 300  # 5 minutes
+
+# User fields that feed get_alert_settings()
+ALERT_SETTINGS_FIELDS = frozenset({
+    'sentiment_alert_threshold',
+    'impact_alert_threshold',
+    'email_notifications',
+    'sms_notifications',
+})
+
+PROFILE_COMPLETION_CACHE_KEY = 'profile_pct:{pk}'
+PROFILE_COMPLETION_CACHE_TIMEOUT = 3600  # 1 hour
+
+# User fields that feed the profile completion percentage
+PROFILE_COMPLETION_FIELDS = frozenset({'full_name', 'email', 'phone_number', 'company'})
+
+UNREAD_COUNT_CACHE_KEY = 'unread_alerts:{pk}'
+UNREAD_COUNT_CACHE_TIMEOUT = 60
+UNREAD_ETAG_CACHE_KEY = 'unread_alerts_etag:{pk}'
+
+# Cached paginator count for the sessions page
+SESSIONS_COUNT_CACHE_KEY = 'sessions_count:{pk}'
+
+
+def recent_unread_notifications():
+    """Prefetch of a user's newest unread notifications into recent_unread_notifications"""
+    # Newest unread only; the dashboard counts the rest with COUNT(*)
+    return Prefetch(
+        'notifications',
+        queryset=UserNotification.objects.list_view().filter(is_read=False)[:5],
+        to_attr='recent_unread_notifications'
+    )
 
 
 class User(AbstractUser):
@@ -118,10 +159,56 @@ class User(AbstractUser):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Requires the pg_trgm extension (core migration 0007); backs admin full_name search
+            GinIndex(fields=['full_name'], name='users_full_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Covers the admin changelist ORDER BY -date_joined ... LIMIT
+            models.Index(
+                fields=['-date_joined', 'id'],
+                name='user_joined_desc_idx',
+                include=['username', 'email', 'is_active'],
+            ),
+        ]
+        constraints = [
+            # Matches the UPPER(email) expression Postgres uses for email__iexact;
+            # lookups add .exclude(email='') so the planner can use this partial index
+            models.UniqueConstraint(
+                Upper('email'),
+                name='users_email_ci_uniq',
+                condition=~models.Q(email=''),
+            ),
+            # Same ranges as the field validators, enforced for writes that skip full_clean()
+            models.CheckConstraint(
+                check=models.Q(sentiment_alert_threshold__range=(0.1, 1.0)),
+                name='user_sentiment_threshold_range',
+            ),
+            models.CheckConstraint(
+                check=models.Q(impact_alert_threshold__range=(0.1, 1.0)),
+                name='user_impact_threshold_range',
+            ),
+            models.CheckConstraint(
+                check=models.Q(dashboard_refresh_interval__range=(60, 3600)),
+                name='user_refresh_interval_range',
+            ),
+            models.CheckConstraint(
+                check=models.Q(default_analysis_period__range=(1, 365)),
+                name='user_analysis_period_range',
+            ),
+        ]
     
     def __str__(self):
         return self.get_display_name()
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a username/email change can release the old values
+        instance._loaded_identifiers = (
+            instance.__dict__.get('username'),
+            instance.__dict__.get('email'),
+        )
+        return instance
+    
     def get_display_name(self):
         """Get user's display name"""
         if self.full_name:
@@ -134,29 +221,108 @@ class User(AbstractUser):
     
     def increment_login_count(self, ip_address=None):
         """Track user login"""
-        self.login_count += 1
+        updates = {'login_count': F('login_count') + 1}
         if ip_address:
+            updates['last_login_ip'] = ip_address
             self.last_login_ip = ip_address
-        self.save(update_fields=['login_count', 'last_login_ip'])
+        User.objects.filter(pk=self.pk).update(**updates)
+        # Counter was computed in SQL; reload it only if it is read again
+        self.__dict__.pop('login_count', None)
     
     def update_dashboard_access(self):
         """Track dashboard access"""
         self.last_dashboard_access = timezone.now()
-        self.save(update_fields=['last_dashboard_access'])
+        User.objects.filter(pk=self.pk).update(last_dashboard_access=self.last_dashboard_access)
     
     def get_alert_settings(self):
-        """Get user's alert configuration"""
+        """Get user's alert configuration (cached, see invalidate_alert_settings)"""
+        return cache.get_or_set(
+            ALERT_SETTINGS_CACHE_KEY.format(pk=self.pk),
+            self._build_alert_settings,
+            ALERT_SETTINGS_CACHE_TIMEOUT
+        )
+    
+    def _build_alert_settings(self):
         return {
             'sentiment_threshold': self.sentiment_alert_threshold,
             'impact_threshold': self.impact_alert_threshold,
             'email_notifications': self.email_notifications,
             'sms_notifications': self.sms_notifications,
-            'preferred_stocks': list(self.preferred_stocks.values_list('symbol', flat=True)),
-            'preferred_industries': list(self.preferred_industries.values_list('name', flat=True))
+            # .all() is served from the prefetch cache when the caller set one up
+            'preferred_stocks': [stock.symbol for stock in self.preferred_stocks.all()],
+            'preferred_industries': [industry.name for industry in self.preferred_industries.all()]
+        }
+    
+    @staticmethod
+    def invalidate_alert_settings(*user_ids):
+        """Drop cached alert settings for the given users"""
+        cache.delete_many([ALERT_SETTINGS_CACHE_KEY.format(pk=pk) for pk in user_ids])
+    
+    @staticmethod
+    def invalidate_profile_completion(*user_ids):
+        """Drop cached profile completion percentages for the given users"""
+        cache.delete_many([PROFILE_COMPLETION_CACHE_KEY.format(pk=pk) for pk in user_ids])
+
+
+class DirtyJSONMixin:
+    """
+    Leave unchanged JSON columns out of UPDATEs
+    
+    Rows loaded from the database remember their JSON values; save()
+    narrows update_fields to skip any JSON field that still compares
+    equal, so small edits do not rewrite large jsonb documents.
+    """
+    
+    @classmethod
+    def _json_field_names(cls):
+        return [
+            field.attname for field in cls._meta.concrete_fields
+            if isinstance(field, models.JSONField)
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_json()
+        return instance
+    
+    def _snapshot_json(self):
+        self._original_json = {
+            name: deepcopy(self.__dict__[name])
+            for name in self._json_field_names()
+            if name in self.__dict__
+        }
+    
+    def _unchanged_json_fields(self):
+        original = getattr(self, '_original_json', {})
+        return {
+            name for name, value in original.items()
+            if name in self.__dict__ and self.__dict__[name] == value
         }
+    
+    def save(self, *args, **kwargs):
+        unchanged = set()
+        if not self._state.adding and not kwargs.get('force_insert'):
+            unchanged = self._unchanged_json_fields()
+        
+        if unchanged:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields
+                if self._meta.get_field(name).attname not in unchanged
+            ]
+        
+        super().save(*args, **kwargs)
+        self._snapshot_json()
 
 
-class UserProfile(TimeStampedModel):
+class UserProfile(DirtyJSONMixin, TimeStampedModel):
     """
     Extended user profile with additional metadata
     """
@@ -261,6 +427,17 @@ class UserProfile(TimeStampedModel):
         db_table = 'user_profiles'
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(experience_years__isnull=True) | models.Q(experience_years__range=(0, 50)),
+                name='profile_experience_years_range',
+            ),
+        ]
+        indexes = [
+            # Containment lookups (__contains) on the JSON lists
+            GinIndex(fields=['custom_watchlists'], name='up_watchlists_gin', opclasses=['jsonb_path_ops']),
+            GinIndex(fields=['favorite_metrics'], name='up_fav_metrics_gin', opclasses=['jsonb_path_ops']),
+        ]
     
     def __str__(self):
         return f"Profile for {self.user.get_display_name()}"
@@ -282,6 +459,8 @@ class UserSession(TimeStampedModel):
     
     # Session metadata
     login_time = models.DateTimeField(auto_now_add=True)
+    # Also moved forward in bulk by the Redis heartbeat (apps.accounts.heartbeat)
+    # when SessionActivityMiddleware is enabled
     last_activity = models.DateTimeField(auto_now=True)
     logout_time = models.DateTimeField(null=True, blank=True)
     
@@ -303,8 +482,8 @@ class UserSession(TimeStampedModel):
         db_table = 'user_sessions'
         ordering = ['-login_time']
         indexes = [
-            models.Index(fields=['user', 'is_active']),
-            models.Index(fields=['session_key']),
+            models.Index(fields=['user', 'is_active', '-last_activity']),
+            models.Index(fields=['-login_time'], name='session_login_desc_idx'),
         ]
     
     def __str__(self):
@@ -320,9 +499,24 @@ class UserSession(TimeStampedModel):
         self.logout_time = timezone.now()
         self.is_active = False
         self.save(update_fields=['logout_time', 'is_active'])
+        UserSession.invalidate_session_count(self.user_id)
+    
+    @staticmethod
+    def invalidate_session_count(*user_ids):
+        """Drop cached session counts for the given users"""
+        cache.delete_many([SESSIONS_COUNT_CACHE_KEY.format(pk=pk) for pk in user_ids])
+
 
+# Minimum time between two triggers of the same alert
+ALERT_FREQUENCY_INTERVALS = {
+    'immediate': timezone.timedelta(0),
+    'hourly': timezone.timedelta(hours=1),
+    'daily': timezone.timedelta(days=1),
+    'weekly': timezone.timedelta(weeks=1),
+}
 
-class UserAlert(TimeStampedModel):
+
+class UserAlert(DirtyJSONMixin, TimeStampedModel):
     """
     Custom user alerts and notifications
     """
@@ -417,8 +611,17 @@ class UserAlert(TimeStampedModel):
         db_table = 'user_alerts'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'is_active']),
-            models.Index(fields=['alert_type']),
+            models.Index(fields=['user', 'is_active', 'alert_type']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(sentiment_threshold__isnull=True) | models.Q(sentiment_threshold__range=(-1.0, 1.0)),
+                name='alert_sentiment_threshold_range',
+            ),
+            models.CheckConstraint(
+                check=models.Q(impact_threshold__isnull=True) | models.Q(impact_threshold__range=(0.0, 1.0)),
+                name='alert_impact_threshold_range',
+            ),
         ]
     
     def __str__(self):
@@ -435,24 +638,29 @@ class UserAlert(TimeStampedModel):
         now = timezone.now()
         time_since_last = now - self.last_triggered
         
-        frequency_map = {
-            'immediate': timezone.timedelta(0),
-            'hourly': timezone.timedelta(hours=1),
-            'daily': timezone.timedelta(days=1),
-            'weekly': timezone.timedelta(weeks=1),
-        }
-        
-        min_interval = frequency_map.get(self.frequency_limit, timezone.timedelta(0))
+        min_interval = ALERT_FREQUENCY_INTERVALS.get(self.frequency_limit, timezone.timedelta(0))
         return time_since_last >= min_interval
     
     def trigger(self):
         """Mark alert as triggered"""
-        self.last_triggered = timezone.now()
-        self.trigger_count += 1
-        self.save(update_fields=['last_triggered', 'trigger_count'])
+        UserAlert.objects.filter(pk=self.pk).update(
+            last_triggered=Now(),
+            trigger_count=F('trigger_count') + 1
+        )
+        # Values were computed in SQL; reload them only if they are read again
+        self.__dict__.pop('last_triggered', None)
+        self.__dict__.pop('trigger_count', None)
+
 
+class UserNotificationQuerySet(models.QuerySet):
+    """QuerySet helpers for notification lists"""
+    
+    def list_view(self):
+        """Notifications for list pages, leaving out the free-form data payload"""
+        return self.defer('data')
 
-class UserNotification(TimeStampedModel):
+
+class UserNotification(DirtyJSONMixin, TimeStampedModel):
     """
     Delivered notifications/alerts to users
     """
@@ -517,13 +725,16 @@ class UserNotification(TimeStampedModel):
         help_text="Additional notification data"
     )
     
+    objects = UserNotificationQuerySet.as_manager()
+    
     class Meta:
         db_table = 'user_notifications'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'is_read']),
-            models.Index(fields=['notification_type']),
-            models.Index(fields=['priority']),
+            # Unread-for-user lookups, newest first, without a sort step
+            models.Index(fields=['user', 'is_read', '-created_at'], name='un_user_unread_idx'),
+            models.Index(fields=['user', 'notification_type', '-created_at']),
+            GinIndex(fields=['data'], name='un_data_gin', opclasses=['jsonb_path_ops']),
         ]
     
     def __str__(self):
@@ -532,6 +743,38 @@ class UserNotification(TimeStampedModel):
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.is_read:
+            UserNotification.objects.filter(pk=self.pk, is_read=False).update(
+                is_read=True,
+                read_at=Now()
+            )
             self.is_read = True
-            self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
+            # read_at was stamped by the database; reload it only if read again
+            self.__dict__.pop('read_at', None)
+            UserNotification.invalidate_unread_count(self.user_id)
+    
+    @classmethod
+    def unread_count(cls, user_id):
+        """Number of unread notifications for a user (cached briefly)"""
+        return cache.get_or_set(
+            UNREAD_COUNT_CACHE_KEY.format(pk=user_id),
+            lambda: cls.objects.filter(user_id=user_id, is_read=False).count(),
+            UNREAD_COUNT_CACHE_TIMEOUT
+        )
+    
+    @staticmethod
+    def unread_etag(user_id):
+        """ETag for a user's unread count, replaced whenever the count is invalidated"""
+        return cache.get_or_set(
+            UNREAD_ETAG_CACHE_KEY.format(pk=user_id),
+            lambda: uuid.uuid4().hex,
+            UNREAD_COUNT_CACHE_TIMEOUT
+        )
+    
+    @staticmethod
+    def invalidate_unread_count(*user_ids):
+        """Drop cached unread counts (and their ETags) for the given users"""
+        cache.delete_many([
+            key.format(pk=pk)
+            for pk in user_ids
+            for key in (UNREAD_COUNT_CACHE_KEY, UNREAD_ETAG_CACHE_KEY)
+        ])
@@ -2,65 +2,122 @@
 Signals for user account management
 """
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in
-from apps.accounts.models import User, UserProfile, UserSession
+from apps.accounts.models import (
+    User, UserProfile, UserNotification, ALERT_SETTINGS_FIELDS, PROFILE_COMPLETION_FIELDS
+)
+from apps.accounts.availability import remember_user, forget_user
+from apps.accounts.middleware import record_login, get_client_ip
+from apps.accounts.forms import (
+    bump_stock_choices_version, bump_industry_choices_version
+)
+from apps.core.models import StockSymbol, Industry
+from apps.accounts.tasks import create_user_profile_task
 
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
-    """Create UserProfile when User is created"""
+    """Queue UserProfile creation once the new User is committed"""
     if created:
-        UserProfile.objects.create(user=instance)
+        user_id = instance.pk
+        transaction.on_commit(lambda: create_user_profile_task.delay(user_id))
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+def invalidate_user_alert_settings(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached alert settings when alert-related fields are saved"""
+    if created:
+        return
+    if update_fields is not None and not ALERT_SETTINGS_FIELDS.intersection(update_fields):
+        return
+    User.invalidate_alert_settings(instance.pk)
 
 
-@receiver(user_logged_in)
-def track_user_login(sender, request, user, **kwargs):
-    """Track user login activity"""
-    # Get IP address
-    ip_address = get_client_ip(request)
-    
-    # Update user login tracking
-    user.increment_login_count(ip_address)
-    
-    # Create or update session tracking
-    session_key = request.session.session_key
-    if session_key:
-        user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
-        
-        # Close any existing active sessions for this user
-        UserSession.objects.filter(
-            user=user,
-            is_active=True
-        ).exclude(
-            session_key=session_key
-        ).update(is_active=False)
-        
-        # Create new session record
-        UserSession.objects.update_or_create(
-            session_key=session_key,
-            defaults={
-                'user': user,
-                'ip_address': ip_address,
-                'user_agent': user_agent,
-                'is_active': True
-            }
+@receiver(post_save, sender=User)
+def invalidate_user_profile_completion(sender, instance, created, update_fields=None, **kwargs):
+    """Drop the cached profile completion when its User fields are saved"""
+    if created:
+        return
+    if update_fields is not None and not PROFILE_COMPLETION_FIELDS.intersection(update_fields):
+        return
+    User.invalidate_profile_completion(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_completion(sender, instance, **kwargs):
+    """Drop the cached profile completion when the profile changes"""
+    User.invalidate_profile_completion(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def remember_taken_identifiers(sender, instance, created, update_fields=None, **kwargs):
+    """Add a saved user's username/email to the availability sets"""
+    if created or update_fields is None or {'username', 'email'}.intersection(update_fields):
+        remember_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def forget_taken_identifiers(sender, instance, **kwargs):
+    """Release a deleted user's username/email"""
+    forget_user(instance)
+
+
+def _invalidate_preference_caches(*user_ids):
+    User.invalidate_alert_settings(*user_ids)
+    User.invalidate_profile_completion(*user_ids)
+
+
+@receiver(m2m_changed, sender=User.preferred_stocks.through)
+@receiver(m2m_changed, sender=User.preferred_industries.through)
+def invalidate_preference_caches(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached alert settings and profile completion when preferred stocks/industries change"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _invalidate_preference_caches(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        _invalidate_preference_caches(*pk_set)
+    elif action == 'pre_clear':
+        # Clearing from the stock/industry side: collect users before the rows go
+        target_field = next(
+            field for field in sender._meta.get_fields()
+            if field.many_to_one and field.related_model is instance.__class__
+        )
+        _invalidate_preference_caches(
+            *sender.objects.filter(**{target_field.attname: instance.pk}).values_list('user_id', flat=True)
         )
 
 
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+@receiver(post_save, sender=UserNotification)
+@receiver(post_delete, sender=UserNotification)
+def invalidate_unread_count(sender, instance, **kwargs):
+    """Drop the cached unread count when a user's notifications change"""
+    UserNotification.invalidate_unread_count(instance.user_id)
+
+
+@receiver(post_save, sender=StockSymbol)
+@receiver(post_delete, sender=StockSymbol)
+def clear_stock_choices(sender, **kwargs):
+    """Drop cached stock choice lists when stocks change"""
+    bump_stock_choices_version()
+
+
+@receiver(post_save, sender=Industry)
+@receiver(post_delete, sender=Industry)
+def clear_onboarding_industry_choices(sender, **kwargs):
+    """Drop cached onboarding industry choices when industries change"""
+    bump_industry_choices_version()
+
+
+@receiver(user_logged_in)
+def track_user_login(sender, request, user, **kwargs):
+    """Track user login activity"""
+    record_login(
+        user,
+        request.session.session_key,
+        get_client_ip(request),
+        request.META.get('HTTP_USER_AGENT', '')[:500]
+    )
@@ -0,0 +1,40 @@
+"""
+Celery tasks for user accounts
+
+Kept in the accounts app so they are only discovered and registered when
+apps.accounts is installed.
+"""
+
+import logging
+from typing import Dict
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def create_user_profile_task(user_id: int) -> Dict:
+    """
+    Create the UserProfile for a newly registered user
+    """
+    from apps.accounts.models import UserProfile
+    
+    profile, created = UserProfile.objects.get_or_create(user_id=user_id)
+    return {'success': True, 'profile_id': profile.pk, 'created': created}
+
+
+@shared_task
+def flush_session_activity_task() -> Dict:
+    """
+    Periodic task moving session heartbeats from Redis to UserSession
+    """
+    from apps.accounts.heartbeat import flush_session_activity
+    
+    try:
+        updated = flush_session_activity()
+        if updated:
+            logger.info(f"[Sessions] Flushed activity for {updated} sessions")
+        return {'success': True, 'sessions_updated': updated}
+    except Exception as e:
+        logger.error(f"[Sessions] Activity flush error: {e}", exc_info=True)
+        return {'success': False, 'error': str(e)}
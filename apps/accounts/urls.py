@@ -8,7 +8,31 @@ from . import views
 
 app_name = 'accounts'
 
+# Password reset views, built once at import
+PASSWORD_RESET_VIEW = auth_views.PasswordResetView.as_view(
+    template_name='accounts/password_reset.html',
+    email_template_name='accounts/password_reset_email.html',
+    subject_template_name='accounts/password_reset_subject.txt',
+    success_url='/accounts/password-reset/done/'
+)
+PASSWORD_RESET_DONE_VIEW = auth_views.PasswordResetDoneView.as_view(
+    template_name='accounts/password_reset_done.html'
+)
+PASSWORD_RESET_CONFIRM_VIEW = auth_views.PasswordResetConfirmView.as_view(
+    template_name='accounts/password_reset_confirm.html',
+    success_url='/accounts/reset/done/'
+)
+PASSWORD_RESET_COMPLETE_VIEW = auth_views.PasswordResetCompleteView.as_view(
+    template_name='accounts/password_reset_complete.html'
+)
+
 urlpatterns = [
+    # AJAX endpoints (polled, so matched first)
+    path('api/unread-alerts-count/', views.get_unread_alerts_count, name='unread_alerts_count'),
+    path('api/unread-alerts/', views.get_unread_alerts, name='unread_alerts'),
+    path('api/check-username/', views.check_username_availability, name='check_username'),
+    path('api/check-email/', views.check_email_availability, name='check_email'),
+    
     # Authentication URLs
     path('login/', views.CustomLoginView.as_view(), name='login'),
     path('logout/', views.logout_view, name='logout'),
@@ -27,30 +51,10 @@ urlpatterns = [
     
     # Password Management
     path('change-password/', views.change_password_view, name='change_password'),
-    path('password-reset/', 
-         auth_views.PasswordResetView.as_view(
-             template_name='accounts/password_reset.html',
-             email_template_name='accounts/password_reset_email.html',
-             subject_template_name='accounts/password_reset_subject.txt',
-             success_url='/accounts/password-reset/done/'
-         ), 
-         name='password_reset'),
-    path('password-reset/done/', 
-         auth_views.PasswordResetDoneView.as_view(
-             template_name='accounts/password_reset_done.html'
-         ), 
-         name='password_reset_done'),
-    path('reset/<uidb64>/<token>/', 
-         auth_views.PasswordResetConfirmView.as_view(
-             template_name='accounts/password_reset_confirm.html',
-             success_url='/accounts/reset/done/'
-         ), 
-         name='password_reset_confirm'),
-    path('reset/done/', 
-         auth_views.PasswordResetCompleteView.as_view(
-             template_name='accounts/password_reset_complete.html'
-         ), 
-         name='password_reset_complete'),
+    path('password-reset/', PASSWORD_RESET_VIEW, name='password_reset'),
+    path('password-reset/done/', PASSWORD_RESET_DONE_VIEW, name='password_reset_done'),
+    path('reset/<uidb64>/<token>/', PASSWORD_RESET_CONFIRM_VIEW, name='password_reset_confirm'),
+    path('reset/done/', PASSWORD_RESET_COMPLETE_VIEW, name='password_reset_complete'),
     
     # Alerts & Notifications
     path('alerts/', views.alerts_view, name='alerts'),
@@ -60,9 +64,4 @@ urlpatterns = [
     # Session Management
     path('sessions/', views.sessions_view, name='sessions'),
     path('sessions/<int:session_id>/terminate/', views.terminate_session, name='terminate_session'),
-    
-    # AJAX endpoints
-    path('api/unread-alerts-count/', views.get_unread_alerts_count, name='unread_alerts_count'),
-    path('api/check-username/', views.check_username_availability, name='check_username'),
-    path('api/check-email/', views.check_email_availability, name='check_email'),
 ]
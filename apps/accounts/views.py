@@ -2,24 +2,36 @@
 Authentication views for GPW2 Trading Intelligence Platform
 """
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponse, HttpResponseRedirect, Http404
 from django.urls import reverse_lazy, reverse
 from django.views.generic import CreateView, UpdateView, FormView
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_cookie
 from django.utils.decorators import method_decorator
-from django.db import transaction
-from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q, prefetch_related_objects
+from django.db.models.functions import Now
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
 from typing import cast
 import json
 import logging
 
-from .models import User, UserProfile, UserSession, UserAlert, UserNotification
+from .availability import is_email_taken, is_username_taken
+from .middleware import get_client_ip
+from .models import (
+    User, UserProfile, UserSession, UserAlert, UserNotification,
+    PROFILE_COMPLETION_CACHE_KEY, PROFILE_COMPLETION_CACHE_TIMEOUT, SESSIONS_COUNT_CACHE_KEY,
+    recent_unread_notifications
+)
 from .forms import (
     CustomLoginForm, CustomRegistrationForm, UserProfileForm,
     UserPreferencesForm, PasswordChangeForm, OnboardingForm
@@ -27,6 +39,44 @@ from .forms import (
 
 logger = logging.getLogger(__name__)
 
+# Notification type filter options for the alerts page
+NOTIFICATION_TYPE_CHOICES = UserNotification._meta.get_field('notification_type').choices
+
+# Cached paginator counts; the alerts key includes the unread ETag, which
+# changes whenever one of the user's notifications does, and the sessions
+# key is dropped whenever one of the user's sessions is written
+ALERTS_COUNT_CACHE_KEY = 'alerts_count:{pk}:{etag}:{status}:{type}'
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60
+
+
+class KeyedCountPaginator(Paginator):
+    """Paginator that reuses a COUNT(*) cached under a caller-supplied key"""
+    
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+    
+    @cached_property
+    def count(self):
+        return cache.get_or_set(
+            self.count_key,
+            self.object_list.count,
+            PAGINATOR_COUNT_CACHE_TIMEOUT
+        )
+
+
+def fast_page(paginator, request):
+    """Page for ?page=, parsed as a plain int with Paginator.get_page()'s fallbacks"""
+    try:
+        number = int(request.GET.get('page') or 1)
+    except ValueError:
+        number = 1
+    try:
+        return paginator.page(number)
+    except EmptyPage:
+        # Below 1 falls back to the first page, past the end to the last
+        return paginator.page(1 if number < 1 else paginator.num_pages)
+
 
 class CustomLoginView(LoginView):
     """Enhanced login view with session tracking"""
@@ -45,35 +95,20 @@ class CustomLoginView(LoginView):
         else:
             self.request.session.set_expiry(0)  # Browser session
         
-        # Track login
+        # Session row is upserted by the user_logged_in signal (record_login)
         user = form.get_user()
-        UserSession.objects.create(
-            user=user,
-            ip_address=self.get_client_ip(),
-            user_agent=self.request.META.get('HTTP_USER_AGENT', '')[:500],
-            is_active=True
-        )
         
         messages.success(self.request, f'Welcome back, {user.get_full_name() or user.username}!')
-        logger.info(f"User {user.username} logged in from {self.get_client_ip()}")
+        logger.info(f"User {user.username} logged in from {get_client_ip(self.request)}")
         
         return response
     
-    def get_client_ip(self):
-        """Get client IP address"""
-        x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = self.request.META.get('REMOTE_ADDR')
-        return ip
-    
     def get_success_url(self):
         """Redirect to dashboard or onboarding"""
         user = cast(User, self.request.user)
         
         # Check if user needs onboarding
-        if hasattr(user, 'onboarding_completed') and not user.onboarding_completed:
+        if not user.onboarding_completed:
             return reverse('accounts:onboarding')
         
         # Redirect to next parameter or dashboard
@@ -98,18 +133,10 @@ class RegistrationView(CreateView):
         """Register user and auto-login"""
         response = super().form_valid(form)
         
-        # Auto-login the user
-        user = form.save()
+        # Auto-login the user; the user_logged_in signal upserts the session row
+        user = self.object
         login(self.request, user)
         
-        # Track registration
-        UserSession.objects.create(
-            user=user,
-            ip_address=self.get_client_ip(),
-            user_agent=self.request.META.get('HTTP_USER_AGENT', '')[:500],
-            is_active=True
-        )
-        
         messages.success(
             self.request,
             f'Welcome to GPW2 Trading Intelligence, {user.get_full_name()}! Let\'s get you set up.'
@@ -117,27 +144,20 @@ class RegistrationView(CreateView):
         logger.info(f"New user registered: {user.username}")
         
         return response
-    
-    def get_client_ip(self):
-        """Get client IP address"""
-        x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = self.request.META.get('REMOTE_ADDR')
-        return ip
 
 
 @require_http_methods(["POST"])
 def logout_view(request):
     """Logout view with session cleanup"""
     if request.user.is_authenticated:
-        # Mark current session as inactive
-        UserSession.objects.filter(
-            user=request.user,
-            is_active=True,
-            ip_address=get_client_ip(request)
-        ).update(is_active=False)
+        # Mark current session as inactive via its unique session key
+        session_key = request.session.session_key
+        if session_key:
+            UserSession.objects.filter(
+                session_key=session_key,
+                is_active=True
+            ).update(is_active=False, logout_time=Now())
+            UserSession.invalidate_session_count(request.user.pk)
         
         logger.info(f"User {request.user.username} logged out")
         
@@ -150,17 +170,18 @@ def logout_view(request):
 def dashboard_view(request):
     """User dashboard view"""
     user = request.user
+    prefetch_related_objects([user], recent_unread_notifications())
     
-    # Get user's recent alerts
-    recent_alerts = UserNotification.objects.filter(
-        user=user,
-        is_read=False
-    ).order_by('-created_at')[:5]
+    # Get user's newest unread alerts and the total unread count
+    recent_alerts = user.recent_unread_notifications
+    unread_alerts_count = UserNotification.unread_count(user.pk)
     
     # Get user's recent sessions
-    recent_sessions = UserSession.objects.filter(
-        user=user
-    ).order_by('-login_time')[:5]
+    recent_sessions = list(
+        UserSession.objects.filter(user=user)
+        .only('ip_address', 'user_agent', 'login_time', 'logout_time', 'is_active')
+        .order_by('-login_time')[:5]
+    )
     
     # Check if profile is incomplete
     profile_completion = calculate_profile_completion(user)
@@ -170,7 +191,7 @@ def dashboard_view(request):
         'recent_alerts': recent_alerts,
         'recent_sessions': recent_sessions,
         'profile_completion': profile_completion,
-        'unread_alerts_count': recent_alerts.count(),
+        'unread_alerts_count': unread_alerts_count,
     }
     
     return render(request, 'accounts/dashboard.html', context)
@@ -180,7 +201,8 @@ def dashboard_view(request):
 def profile_view(request):
     """User profile view"""
     user = request.user
-    profile = user.profile
+    # The profile is created asynchronously after registration
+    profile, _ = UserProfile.objects.get_or_create(user=user)
     
     if request.method == 'POST':
         form = UserProfileForm(request.POST, instance=profile)
@@ -244,7 +266,7 @@ def onboarding_view(request):
     user = cast(User, request.user)
     
     # Redirect if already completed
-    if hasattr(user, 'onboarding_completed') and user.onboarding_completed:
+    if user.onboarding_completed:
         return redirect('dashboard:home')
     
     if request.method == 'POST':
@@ -280,23 +302,28 @@ def alerts_view(request):
     if alert_type != 'all':
         alerts = alerts.filter(notification_type=alert_type)
     
-    alerts = alerts.order_by('-created_at')
+    # Plain dict rows: the list page only reads these columns
+    alerts = alerts.order_by('-created_at').values(
+        'id', 'title', 'message', 'notification_type', 'priority', 'is_read', 'read_at', 'created_at'
+    )
     
     # Pagination
-    paginator = Paginator(alerts, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get notification type choices for filter
-    alert_types = UserNotification._meta.get_field('notification_type').choices
+    count_key = ALERTS_COUNT_CACHE_KEY.format(
+        pk=user.pk,
+        etag=UserNotification.unread_etag(user.pk),
+        status=status_filter,
+        type=alert_type
+    )
+    paginator = KeyedCountPaginator(alerts, 20, count_key)
+    page_obj = fast_page(paginator, request)
     
     context = {
         'page_obj': page_obj,
         'alerts': page_obj.object_list,
         'status_filter': status_filter,
         'alert_type': alert_type,
-        'alert_types': alert_types,
-        'unread_count': UserNotification.objects.filter(user=user, is_read=False).count(),
+        'alert_types': NOTIFICATION_TYPE_CHOICES,
+        'unread_count': UserNotification.unread_count(user.pk),
     }
     
     return render(request, 'accounts/alerts.html', context)
@@ -306,8 +333,13 @@ def alerts_view(request):
 @require_http_methods(["POST"])
 def mark_alert_read(request, alert_id):
     """Mark alert as read"""
-    alert = get_object_or_404(UserNotification, id=alert_id, user=request.user)
-    alert.mark_as_read()
+    updated = UserNotification.objects.filter(
+        id=alert_id, user=request.user, is_read=False
+    ).update(is_read=True, read_at=Now())
+    if not updated and not UserNotification.objects.filter(id=alert_id, user=request.user).exists():
+        raise Http404("No UserNotification matches the given query.")
+    if updated:
+        UserNotification.invalidate_unread_count(request.user.pk)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'status': 'success'})
@@ -319,10 +351,14 @@ def mark_alert_read(request, alert_id):
 @require_http_methods(["POST"])
 def mark_all_alerts_read(request):
     """Mark all alerts as read"""
-    UserNotification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    updated = UserNotification.objects.filter(
+        user=request.user, is_read=False
+    ).update(is_read=True, read_at=Now())
+    if updated:
+        UserNotification.invalidate_unread_count(request.user.pk)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return JsonResponse({'status': 'success'})
+        return JsonResponse({'status': 'success', 'updated': updated})
     
     messages.success(request, 'All alerts marked as read.')
     return redirect('accounts:alerts')
@@ -336,9 +372,8 @@ def sessions_view(request):
     sessions = UserSession.objects.filter(user=user).order_by('-login_time')
     
     # Pagination
-    paginator = Paginator(sessions, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeyedCountPaginator(sessions, 15, SESSIONS_COUNT_CACHE_KEY.format(pk=user.pk))
+    page_obj = fast_page(paginator, request)
     
     context = {
         'page_obj': page_obj,
@@ -353,9 +388,10 @@ def sessions_view(request):
 @require_http_methods(["POST"])
 def terminate_session(request, session_id):
     """Terminate a user session"""
-    session = get_object_or_404(UserSession, id=session_id, user=request.user)
-    session.is_active = False
-    session.save()
+    updated = UserSession.objects.filter(id=session_id, user=request.user).update(is_active=False)
+    if not updated:
+        raise Http404("No UserSession matches the given query.")
+    UserSession.invalidate_session_count(request.user.pk)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'status': 'success'})
@@ -370,18 +406,22 @@ def account_security_view(request):
     user = request.user
     
     # Get recent login activity
-    recent_logins = UserSession.objects.filter(
-        user=user
-    ).order_by('-login_time')[:10]
-    
-    # Security metrics
-    active_sessions = UserSession.objects.filter(user=user, is_active=True).count()
-    total_logins = UserSession.objects.filter(user=user).count()
+    recent_logins = list(
+        UserSession.objects.filter(user=user)
+        .only('ip_address', 'user_agent', 'login_time', 'logout_time', 'is_active')
+        .order_by('-login_time')[:10]
+    )
+    
+    # Security metrics in one aggregate query
+    session_counts = UserSession.objects.filter(user=user).aggregate(
+        active=Count('id', filter=Q(is_active=True)),
+        total=Count('id')
+    )
     
     context = {
         'recent_logins': recent_logins,
-        'active_sessions': active_sessions,
-        'total_logins': total_logins,
+        'active_sessions': session_counts['active'],
+        'total_logins': session_counts['total'],
         'current_ip': get_client_ip(request),
     }
     
@@ -390,17 +430,51 @@ def account_security_view(request):
 
 # AJAX Views
 @login_required
+@cache_control(private=True, max_age=10)
+@vary_on_cookie
+@condition(etag_func=lambda request: UserNotification.unread_etag(request.user.pk))
 def get_unread_alerts_count(request):
-    """Get count of unread alerts (AJAX)"""
-    count = UserNotification.objects.filter(user=request.user, is_read=False).count()
+    """Get count of unread alerts (AJAX), cacheable and revalidated by the browser for polling"""
+    count = UserNotification.unread_count(request.user.pk)
     return JsonResponse({'count': count})
 
 
+UNREAD_ALERTS_SQL = """
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'id', n.id,
+               'title', n.title,
+               'message', n.message,
+               'notification_type', n.notification_type,
+               'priority', n.priority,
+               'data', n.data,
+               'created_at', n.created_at
+           )), '[]'::jsonb)::text
+    FROM (
+        SELECT id, title, message, notification_type, priority, data, created_at
+        FROM user_notifications
+        WHERE user_id = %s AND is_read = false
+        ORDER BY created_at DESC
+        LIMIT %s
+    ) AS n
+"""
+
+
+@login_required
+@cache_control(private=True, max_age=15)
+@vary_on_cookie
+def get_unread_alerts(request):
+    """Get unread alerts as JSON (AJAX), serialized by Postgres"""
+    with connection.cursor() as cursor:
+        cursor.execute(UNREAD_ALERTS_SQL, [request.user.pk, 50])
+        payload = cursor.fetchone()[0]
+    return HttpResponse(payload, content_type='application/json')
+
+
 @login_required
 def check_username_availability(request):
     """Check username availability (AJAX)"""
     username = request.GET.get('username', '')
-    is_available = not User.objects.filter(username=username).exists()
+    is_available = not is_username_taken(username)
     return JsonResponse({'available': is_available})
 
 
@@ -408,50 +482,46 @@ def check_username_availability(request):
 def check_email_availability(request):
     """Check email availability (AJAX)"""
     email = request.GET.get('email', '')
-    is_available = not User.objects.filter(email=email).exists()
+    is_available = not is_email_taken(email)
     return JsonResponse({'available': is_available})
 
 
 # Utility Functions
-def get_client_ip(request):
-    """Get client IP address"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+def calculate_profile_completion(user):
+    """Calculate profile completion percentage (cached per user)"""
+    return cache.get_or_set(
+        PROFILE_COMPLETION_CACHE_KEY.format(pk=user.pk),
+        lambda: _compute_profile_completion(user.pk),
+        PROFILE_COMPLETION_CACHE_TIMEOUT
+    )
 
 
-def calculate_profile_completion(user):
-    """Calculate profile completion percentage"""
+def _compute_profile_completion(user_id):
+    """Read every input of the completion score in one query"""
     total_fields = 10
-    completed_fields = 0
-    
-    # Check user fields
-    if user.full_name:
-        completed_fields += 1
-    if user.email:
-        completed_fields += 1
-    if user.phone_number:
-        completed_fields += 1
-    if user.company:
-        completed_fields += 1
-    if user.preferred_stocks.exists():
-        completed_fields += 1
-    if user.preferred_industries.exists():
-        completed_fields += 1
-    
-    # Check profile fields
-    if hasattr(user, 'profile'):
-        profile = user.profile
-        if profile.experience_years is not None:
-            completed_fields += 1
-        if profile.investment_focus:
-            completed_fields += 1
-        if profile.risk_tolerance:
-            completed_fields += 1
-        if profile.portfolio_size_range:
-            completed_fields += 1
+    row = User.objects.filter(pk=user_id).annotate(
+        has_stocks=Exists(User.preferred_stocks.through.objects.filter(user_id=OuterRef('pk'))),
+        has_industries=Exists(User.preferred_industries.through.objects.filter(user_id=OuterRef('pk'))),
+    ).values(
+        'full_name', 'email', 'phone_number', 'company', 'has_stocks', 'has_industries',
+        'profile__experience_years', 'profile__investment_focus',
+        'profile__risk_tolerance', 'profile__portfolio_size_range',
+    ).first()
+    if row is None:
+        return 0
+    
+    # Missing profile joins as NULLs, which count as incomplete
+    completed_fields = sum([
+        bool(row['full_name']),
+        bool(row['email']),
+        bool(row['phone_number']),
+        bool(row['company']),
+        row['has_stocks'],
+        row['has_industries'],
+        row['profile__experience_years'] is not None,
+        bool(row['profile__investment_focus']),
+        bool(row['profile__risk_tolerance']),
+        bool(row['profile__portfolio_size_range']),
+    ])
     
     return round((completed_fields / total_fields) * 100)
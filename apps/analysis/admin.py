@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from django.urls import reverse
 from django.contrib import messages
 from .models import TimeWeightConfiguration
@@ -64,57 +64,36 @@ class TimeWeightConfigurationAdmin(admin.ModelAdmin):
         })
     )
     
+    def _display(self, obj, key):
+        """Read a precomputed display string, rebuilding it for rows saved before the cache existed"""
+        display = obj.display_cache.get(key)
+        if display is None:
+            display = obj.build_display_cache()[key]
+        return display
+    
     def trading_style_display(self, obj):
         """Display trading style with color coding"""
-        colors = {
-            'intraday': '#e74c3c',  # Red
-            'swing': '#3498db',     # Blue
-            'position': '#2ecc71'   # Green
-        }
-        color = colors.get(obj.trading_style, '#95a5a6')
-        return format_html(
-            '<span style="color: {}; font-weight: bold;">{}</span>',
-            color,
-            obj.get_trading_style_display()
-        )
+        return mark_safe(self._display(obj, 'trading_style'))
     trading_style_display.short_description = 'Trading Style'
     
     def half_life_display(self, obj):
         """Display half-life in readable format"""
-        if obj.half_life_minutes < 60:
-            return f"{obj.half_life_minutes}min"
-        elif obj.half_life_minutes < 1440:
-            hours = obj.half_life_minutes / 60
-            return f"{hours:.1f}h"
-        else:
-            days = obj.half_life_minutes / 1440
-            return f"{days:.1f}d"
+        return self._display(obj, 'half_life')
     half_life_display.short_description = 'Half-Life'
     
     def weight_distribution(self, obj):
         """Display weight distribution as percentages"""
-        return format_html(
-            '<small>15m: {:.0%} | 1h: {:.0%} | 4h: {:.0%} | Today: {:.0%}</small>',
-            obj.last_15min_weight,
-            obj.last_1hour_weight,
-            obj.last_4hour_weight,
-            obj.today_weight
-        )
+        return mark_safe(self._display(obj, 'weights'))
     weight_distribution.short_description = 'Weight Distribution'
     
     def multipliers_display(self, obj):
         """Display multipliers"""
-        return format_html(
-            '<small>Breaking: {:.1f}x | Market: {:.1f}x | Pre: {:.1f}x</small>',
-            obj.breaking_news_multiplier,
-            obj.market_hours_multiplier,
-            obj.pre_market_multiplier
-        )
+        return mark_safe(self._display(obj, 'multipliers'))
     multipliers_display.short_description = 'Multipliers'
     
     def impact_threshold(self, obj):
         """Display impact threshold"""
-        return f"{obj.min_impact_threshold:.3f}"
+        return self._display(obj, 'threshold')
     impact_threshold.short_description = 'Min Threshold'
     
     def save_model(self, request, obj, form, change):
@@ -154,7 +133,9 @@ class TimeWeightConfigurationAdmin(admin.ModelAdmin):
     
     def activate_configuration(self, request, queryset):
         """Activate selected configurations"""
+        names = list(queryset.values_list('name', flat=True))
         updated = queryset.update(is_active=True)
+        TimeWeightConfiguration.invalidate_active_cache(*names)
         self.message_user(
             request,
             f"✅ {updated} configurations activated",
@@ -164,7 +145,9 @@ class TimeWeightConfigurationAdmin(admin.ModelAdmin):
     
     def deactivate_configuration(self, request, queryset):
         """Deactivate selected configurations"""
+        names = list(queryset.values_list('name', flat=True))
         updated = queryset.update(is_active=False)
+        TimeWeightConfiguration.invalidate_active_cache(*names)
         self.message_user(
             request,
             f"⏸️ {updated} configurations deactivated",
@@ -174,17 +157,19 @@ class TimeWeightConfigurationAdmin(admin.ModelAdmin):
     
     def duplicate_configuration(self, request, queryset):
         """Duplicate selected configurations"""
-        duplicated = 0
+        copies = []
         for config in queryset:
             config.pk = None
             config.name = f"{config.name}_copy"
             config.is_active = False
-            config.save()
-            duplicated += 1
-            
+            copies.append(config)
+        
+        # display_cache is carried over unchanged since no displayed field differs
+        TimeWeightConfiguration.objects.bulk_create(copies, batch_size=500)
+        
         self.message_user(
             request,
-            f"📋 {duplicated} configurations duplicated",
+            f"📋 {len(copies)} configurations duplicated",
             messages.SUCCESS
         )
     duplicate_configuration.short_description = "Duplicate selected configurations"
@@ -3,11 +3,14 @@ AI Detection Engine for GPW Trading Advisor.
 Core algorithms for anomaly detection, pattern recognition, and prediction.
 """
 
+import logging
 import numpy as np
 import pandas as pd
+from dataclasses import dataclass, fields
 from typing import Dict, List, Optional, Tuple, Any
 from decimal import Decimal
 from datetime import date, timedelta
+from django.db import connection
 from django.utils import timezone
 from django.db.models import Avg, Max, Min, StdDev, Count, Q
 
@@ -15,48 +18,126 @@ from apps.core.models import StockSymbol, TradingSession
 from apps.scrapers.models import StockData
 from apps.analysis.models import AnomalyAlert, PricePrediction, RiskAssessment, PatternDetection
 
+logger = logging.getLogger(__name__)
+
+# AnomalyAlert stores its scores and metrics with 4 decimal places
+_Q4 = Decimal('0.0001')
+
+
+def _dec(value: Any, quantum: Decimal = _Q4) -> Decimal:
+    """
+    Convert a detector float to a Decimal at the column's precision, without a str() round trip.
+    """
+    if not isinstance(value, Decimal):
+        value = Decimal.from_float(float(value))
+    return value.quantize(quantum)
+
+
+@dataclass(frozen=True)
+class SeriesBundle:
+    """
+    One stock's latest record per session as column arrays, newest session first.
+    Missing values are NaN.
+    """
+    dates: np.ndarray   # datetime64[D]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    
+    @classmethod
+    def from_rows(cls, rows: List[Tuple]) -> 'SeriesBundle':
+        """
+        Build from (date, open, high, low, close, volume) rows.
+        """
+        count = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 6
+        prices = [
+            np.fromiter((np.nan if value is None else float(value) for value in column),
+                        dtype=np.float64, count=count)
+            for column in columns[1:]
+        ]
+        return cls(np.array(columns[0], dtype='datetime64[D]'), *prices)
+    
+    def __len__(self) -> int:
+        return len(self.dates)
+    
+    def since(self, start_date: date) -> 'SeriesBundle':
+        """
+        The sessions on or after start_date.
+        """
+        keep = self.dates >= np.datetime64(start_date, 'D')
+        return SeriesBundle(**{field.name: getattr(self, field.name)[keep] for field in fields(self)})
+    
+    def present(self, column: str) -> np.ndarray:
+        """
+        A column without its missing (or zero) values.
+        """
+        values = getattr(self, column)
+        return values[np.isfinite(values) & (values != 0)]
+
 
 class AnomalyDetector:
     """
     AI-powered anomaly detection for stock market data.
     """
     
+    # Fields of the analysed session's record that the detectors read
+    CURRENT_FIELDS = ('close_price', 'volume')
+    
     def __init__(self):
         self.default_lookback_days = 30
+        self.pattern_lookback_days = 60
         self.default_confidence_threshold = 0.75
+        self.invalidate()
         
-    def detect_price_anomalies(self, stock: StockSymbol, session: TradingSession) -> List[Dict[str, Any]]:
+    def invalidate(self):
+        """
+        Forget the memoized data of the last (stock, session) analysed.
+        """
+        self._memo_key = None
+        self._memo_days = 0
+        self._memo_recent = SeriesBundle.from_rows([])
+        self._memo_current = None
+        
+    def detect_price_anomalies(self, stock: StockSymbol, session: TradingSession,
+                               recent_data: Optional[SeriesBundle] = None,
+                               current_data: Optional[StockData] = None,
+                               min_confidence: float = 0.0) -> List[Dict[str, Any]]:
         """
         Detect price anomalies using statistical methods.
+        
+        Candidates below min_confidence are dropped before they are built.
         """
         anomalies = []
         
         # Get recent stock data for baseline
-        recent_data = self._get_recent_data(stock, session, days=self.default_lookback_days)
+        if recent_data is None:
+            recent_data = self._get_recent_data(stock, session, days=self.default_lookback_days)
         if len(recent_data) < 10:  # Need sufficient data
             return anomalies
             
         # Get current session data
-        current_data = StockData.objects.filter(
-            stock=stock,
-            trading_session=session
-        ).first()
+        if current_data is None:
+            current_data = self._get_current_data(stock, session)
         
         if not current_data or not current_data.close_price:
             return anomalies
             
-        # Calculate baseline statistics
-        baseline_stats = self._calculate_baseline_stats(recent_data)
         current_price = float(current_data.close_price)
         
-        # Detect price spike/drop using Z-score
-        price_changes = [self._calculate_daily_return(data) for data in recent_data if data]
-        if price_changes:
-            mean_return = np.mean(price_changes)
-            std_return = np.std(price_changes)
+        # Detect price spike/drop using Z-score over session-to-session returns (data is newest first)
+        prices = recent_data.present('close')
+        returns = (prices[:-1] - prices[1:]) / prices[1:]
+        if returns.size:
+            mean_return = float(returns.mean())
+            std_return = float(returns.std())
             
             if len(recent_data) > 1:
-                yesterday_price = float(recent_data[1].close_price) if recent_data[1].close_price else current_price
+                # recent_data excludes the current session, so the previous session comes first
+                previous_close = recent_data.close[0]
+                yesterday_price = float(previous_close) if previous_close > 0 else current_price
                 current_return = (current_price - yesterday_price) / yesterday_price
                 
                 if std_return > 0:
@@ -67,6 +148,8 @@ class AnomalyDetector:
                         anomaly_type = 'price_spike' if z_score > 0 else 'price_drop'
                         severity = min(5, max(1, int(abs(z_score))))
                         confidence = min(0.99, float(abs(z_score) / 4.0))  # Scale to 0-1
+                        if confidence < min_confidence:
+                            return anomalies
                         
                         price_change_percent = current_return * 100
                         
@@ -89,31 +172,36 @@ class AnomalyDetector:
         
         return anomalies
     
-    def detect_volume_anomalies(self, stock: StockSymbol, session: TradingSession) -> List[Dict[str, Any]]:
+    def detect_volume_anomalies(self, stock: StockSymbol, session: TradingSession,
+                                recent_data: Optional[SeriesBundle] = None,
+                                current_data: Optional[StockData] = None,
+                                min_confidence: float = 0.0) -> List[Dict[str, Any]]:
         """
         Detect unusual volume spikes.
+        
+        Candidates below min_confidence are dropped before they are built.
         """
         anomalies = []
         
         # Get recent data for volume baseline
-        recent_data = self._get_recent_data(stock, session, days=self.default_lookback_days)
+        if recent_data is None:
+            recent_data = self._get_recent_data(stock, session, days=self.default_lookback_days)
         if len(recent_data) < 5:
             return anomalies
             
-        current_data = StockData.objects.filter(
-            stock=stock,
-            trading_session=session
-        ).first()
+        if current_data is None:
+            current_data = self._get_current_data(stock, session)
         
         if not current_data or not current_data.volume:
             return anomalies
             
         # Calculate average volume
-        volumes = [float(data.volume) for data in recent_data if data.volume and data.volume > 0]
-        if not volumes:
+        volumes = recent_data.present('volume')
+        volumes = volumes[volumes > 0]
+        if not volumes.size:
             return anomalies
             
-        avg_volume = np.mean(volumes)
+        avg_volume = float(volumes.mean())
         current_volume = float(current_data.volume)
         
         if avg_volume > 0:
@@ -123,6 +211,8 @@ class AnomalyDetector:
             if volume_ratio > 2.0:  # More than 200% of average volume
                 severity = min(5, max(1, int(volume_ratio)))
                 confidence = min(0.99, float((volume_ratio - 1) / 4.0))  # Scale to 0-1
+                if confidence < min_confidence:
+                    return anomalies
                 
                 anomalies.append({
                     'type': 'volume_spike',
@@ -133,28 +223,32 @@ class AnomalyDetector:
                         'current_volume': current_volume,
                         'average_volume': avg_volume,
                         'volume_ratio': volume_ratio,
-                        'baseline_volumes': volumes[-10:]  # Last 10 days for context
+                        'baseline_volumes': volumes[-10:].tolist()  # Last 10 days for context
                     },
                     'volume_ratio': volume_ratio
                 })
         
         return anomalies
     
-    def detect_pattern_breaks(self, stock: StockSymbol, session: TradingSession) -> List[Dict[str, Any]]:
+    def detect_pattern_breaks(self, stock: StockSymbol, session: TradingSession,
+                              recent_data: Optional[SeriesBundle] = None,
+                              current_data: Optional[StockData] = None,
+                              min_confidence: float = 0.0) -> List[Dict[str, Any]]:
         """
         Detect breaks of support/resistance levels.
+        
+        Candidates below min_confidence are dropped before they are built.
         """
         anomalies = []
         
         # Get extended data for pattern analysis
-        recent_data = self._get_recent_data(stock, session, days=60)
+        if recent_data is None:
+            recent_data = self._get_recent_data(stock, session, days=self.pattern_lookback_days)
         if len(recent_data) < 20:
             return anomalies
             
-        current_data = StockData.objects.filter(
-            stock=stock,
-            trading_session=session
-        ).first()
+        if current_data is None:
+            current_data = self._get_current_data(stock, session)
         
         if not current_data or not current_data.close_price:
             return anomalies
@@ -162,20 +256,22 @@ class AnomalyDetector:
         current_price = float(current_data.close_price)
         
         # Calculate support and resistance levels
-        prices = [float(data.close_price) for data in recent_data if data.close_price]
-        highs = [float(data.high_price) for data in recent_data if data.high_price]
-        lows = [float(data.low_price) for data in recent_data if data.low_price]
-        
-        if len(prices) < 20:
+        prices = recent_data.present('close')
+        if prices.size < 20:
             return anomalies
             
+        highs = recent_data.present('high')
+        lows = recent_data.present('low')
+        
         # Simple support/resistance detection
-        resistance_level = max(highs[-20:])  # Recent high
-        support_level = min(lows[-20:])      # Recent low
+        resistance_level = float(highs[-20:].max())  # Recent high
+        support_level = float(lows[-20:].min())      # Recent low
         
         # Check for resistance break (upward)
         if current_price > resistance_level * 1.01:  # 1% above resistance
             confidence = min(0.95, (current_price - resistance_level) / resistance_level * 10)
+            if confidence < min_confidence:
+                return anomalies
             
             anomalies.append({
                 'type': 'resistance_break',
@@ -192,6 +288,8 @@ class AnomalyDetector:
         # Check for support break (downward)
         elif current_price < support_level * 0.99:  # 1% below support
             confidence = min(0.95, (support_level - current_price) / support_level * 10)
+            if confidence < min_confidence:
+                return anomalies
             
             anomalies.append({
                 'type': 'support_break',
@@ -212,82 +310,206 @@ class AnomalyDetector:
         Process all anomaly detection for a single stock and session.
         Returns number of anomalies detected.
         """
-        all_anomalies = []
+        # Fetch the data once for all detectors: the pattern window covers the baseline window
+        current_data = self._get_current_data(stock, session)
+        if not current_data:
+            # Nothing to compare against a baseline, so skip the history query
+            return 0
+        extended_data = self._get_recent_data(stock, session, days=self.pattern_lookback_days)
+        
+        # Save anomalies to database in one batch
+        alerts = self._build_alerts(stock, session, self._detect_all(stock, session, extended_data, current_data))
+        AnomalyAlert.objects.bulk_create(alerts, batch_size=500)
         
-        # Run different detection methods
-        all_anomalies.extend(self.detect_price_anomalies(stock, session))
-        all_anomalies.extend(self.detect_volume_anomalies(stock, session))
-        all_anomalies.extend(self.detect_pattern_breaks(stock, session))
-        
-        # Save anomalies to database
-        created_count = 0
-        for anomaly in all_anomalies:
-            if anomaly['confidence'] >= self.default_confidence_threshold:
-                alert = AnomalyAlert.objects.create(
-                    stock=stock,
-                    trading_session=session,
-                    anomaly_type=anomaly['type'],
-                    severity=anomaly['severity'],
-                    confidence_score=Decimal(str(anomaly['confidence'])),
-                    description=anomaly['description'],
-                    detection_details=anomaly['details'],
-                    price_change_percent=Decimal(str(anomaly.get('price_change_percent', 0))),
-                    volume_ratio=Decimal(str(anomaly.get('volume_ratio', 0))),
-                    z_score=Decimal(str(anomaly.get('z_score', 0)))
+        # The session may still receive data; don't serve it from the memo on a later scan
+        self.invalidate()
+        
+        return len(alerts)
+    
+    def process_session_anomalies(self, session: TradingSession, stocks=None,
+                                  errors: Optional[Dict[int, Exception]] = None) -> Dict[int, int]:
+        """
+        Process anomaly detection for many stocks in one session.
+        
+        The session's records and the history window of every stock are loaded
+        with two queries in total, and the alerts of every stock that succeeded
+        are saved with one bulk insert. A stock whose detection fails is logged
+        and skipped; if errors is given, its exception is stored there by stock id.
+        Returns the number of anomalies detected per successful stock id.
+        """
+        if stocks is None:
+            stocks = StockSymbol.objects.filter(is_active=True)
+        stocks = {stock.pk: stock for stock in stocks}
+        
+        # Latest record of each stock in the session
+        current_records = StockData.objects.filter(
+            stock_id__in=stocks,
+            trading_session=session
+        ).order_by('stock_id', '-data_timestamp').values_list('stock_id', *self.CURRENT_FIELDS, named=True)
+        if connection.features.can_distinct_on_fields:
+            current_records = current_records.distinct('stock_id')
+        current = {}
+        for data in current_records:
+            current.setdefault(data.stock_id, data)
+        
+        # History window of all stocks, latest record per (stock, session)
+        start_date = session.date - timedelta(days=self.pattern_lookback_days)
+        rows = StockData.objects.filter(
+            stock_id__in=stocks,
+            trading_session__date__gte=start_date,
+            trading_session__date__lt=session.date
+        ).order_by('stock_id', '-trading_session__date', '-data_timestamp').values_list(
+            'stock_id', 'trading_session__date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+        )
+        if connection.features.can_distinct_on_fields:
+            rows = rows.distinct('stock_id', 'trading_session__date')
+        history = {}
+        for row in rows:
+            history.setdefault(row[0], {}).setdefault(row[1], row[1:])
+        
+        alerts = []
+        counts = {}
+        for stock_id, stock in stocks.items():
+            if stock_id not in current:
+                # No data for the session, nothing to compare against the baseline
+                counts[stock_id] = 0
+                continue
+            try:
+                extended_data = SeriesBundle.from_rows(list(history.get(stock_id, {}).values()))
+                stock_alerts = self._build_alerts(
+                    stock, session, self._detect_all(stock, session, extended_data, current[stock_id])
                 )
-                created_count += 1
+            except Exception as e:
+                logger.error(f"Anomaly detection failed for {stock.symbol}: {e}", exc_info=True)
+                if errors is not None:
+                    errors[stock_id] = e
+                continue
+            counts[stock_id] = len(stock_alerts)
+            alerts.extend(stock_alerts)
+        
+        AnomalyAlert.objects.bulk_create(alerts, batch_size=500)
+        return counts
+    
+    def _detect_all(self, stock: StockSymbol, session: TradingSession,
+                    extended_data: SeriesBundle, current_data: Optional[StockData]) -> List[Dict[str, Any]]:
+        """
+        Run every detector on preloaded data; extended_data covers the pattern lookback window.
+        """
+        recent_data = self._limit_days(extended_data, session, self.default_lookback_days)
+        if len(recent_data) < 5 and len(extended_data) < 20:
+            # Below every detector's minimum history (volume 5, price 10, pattern breaks 20)
+            return []
         
-        return created_count
+        # Only candidates that can pass the threshold are built
+        threshold = self.default_confidence_threshold
+        all_anomalies = []
+        all_anomalies.extend(self.detect_price_anomalies(stock, session, recent_data, current_data, threshold))
+        all_anomalies.extend(self.detect_volume_anomalies(stock, session, recent_data, current_data, threshold))
+        all_anomalies.extend(self.detect_pattern_breaks(stock, session, extended_data, current_data, threshold))
+        return all_anomalies
+    
+    def _build_alerts(self, stock: StockSymbol, session: TradingSession,
+                      anomalies: List[Dict[str, Any]]) -> List[AnomalyAlert]:
+        """
+        Unsaved AnomalyAlert rows for the anomalies that pass the confidence threshold.
+        """
+        return [
+            AnomalyAlert(
+                stock=stock,
+                trading_session=session,
+                anomaly_type=anomaly['type'],
+                severity=anomaly['severity'],
+                confidence_score=_dec(anomaly['confidence']),
+                description=anomaly['description'],
+                detection_details=anomaly['details'],
+                price_change_percent=_dec(anomaly.get('price_change_percent', 0)),
+                volume_ratio=_dec(anomaly.get('volume_ratio', 0)),
+                z_score=_dec(anomaly.get('z_score', 0))
+            )
+            for anomaly in anomalies
+            if anomaly['confidence'] >= self.default_confidence_threshold
+        ]
     
-    def _get_recent_data(self, stock: StockSymbol, current_session: TradingSession, days: int = 30) -> List[StockData]:
+    def _get_recent_data(self, stock: StockSymbol, current_session: TradingSession, days: int = 30) -> SeriesBundle:
         """
         Get recent stock data for analysis.
+        
+        The widest window any detector uses is fetched once per (stock, session)
+        and narrower windows are sliced from it.
+        """
+        self._use_memo(stock, current_session)
+        if days > self._memo_days:
+            self._memo_days = max(days, self.pattern_lookback_days)
+            self._memo_recent = self._fetch_recent_data(stock, current_session, self._memo_days)
+        
+        return self._limit_days(self._memo_recent, current_session, days)
+    
+    def _fetch_recent_data(self, stock: StockSymbol, current_session: TradingSession, days: int) -> SeriesBundle:
+        """
+        Load the latest record of each session in the `days` days before current_session.
         """
         end_date = current_session.date
         start_date = end_date - timedelta(days=days)
         
+        # One query for the whole window, newest session first and latest record first within it
+        rows = StockData.objects.filter(
+            stock=stock,
+            trading_session__date__gte=start_date,
+            trading_session__date__lt=end_date
+        ).order_by('-trading_session__date', '-data_timestamp').values_list(
+            'trading_session__date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+        )
+        if connection.features.can_distinct_on_fields:
+            # DISTINCT ON lets the database drop the older records of each session
+            rows = rows.distinct('trading_session__date')
+        
         # Get one record per day (latest for each session)
-        sessions = TradingSession.objects.filter(
-            date__gte=start_date,
-            date__lt=end_date
-        ).order_by('-date')
-        
-        data = []
-        for session in sessions:
-            latest_data = StockData.objects.filter(
-                stock=stock,
-                trading_session=session
-            ).order_by('-data_timestamp').first()
-            
-            if latest_data:
-                data.append(latest_data)
+        latest = {}
+        for row in rows:
+            latest.setdefault(row[0], row)
         
-        return data
+        return SeriesBundle.from_rows(list(latest.values()))
     
-    def _calculate_baseline_stats(self, data: List[StockData]) -> Dict[str, float]:
+    def _limit_days(self, data: SeriesBundle, current_session: TradingSession, days: int) -> SeriesBundle:
+        """
+        Narrow data from _get_recent_data to the sessions within the last `days` days.
         """
-        Calculate baseline statistical measures.
+        return data.since(current_session.date - timedelta(days=days))
+    
+    def _get_current_data(self, stock: StockSymbol, session: TradingSession) -> Optional[StockData]:
         """
-        prices = [float(d.close_price) for d in data if d.close_price]
-        volumes = [float(d.volume) for d in data if d.volume and d.volume > 0]
+        Get the stock's latest data for the session being analysed.
         
-        return {
-            'avg_price': float(np.mean(prices)) if prices else 0.0,
-            'std_price': float(np.std(prices)) if prices else 0.0,
-            'avg_volume': float(np.mean(volumes)) if volumes else 0.0,
-            'std_volume': float(np.std(volumes)) if volumes else 0.0,
-            'min_price': float(min(prices)) if prices else 0.0,
-            'max_price': float(max(prices)) if prices else 0.0
-        }
+        Returned as a named row with the fields the detectors read, like close_price
+        and volume, rather than a full StockData instance.
+        """
+        self._use_memo(stock, session)
+        if self._memo_current is None:
+            self._memo_current = StockData.objects.filter(
+                stock=stock,
+                trading_session=session
+            ).order_by('-data_timestamp').values_list(*self.CURRENT_FIELDS, named=True).first()
+        return self._memo_current
     
-    def _calculate_daily_return(self, data: StockData) -> float:
+    def _use_memo(self, stock: StockSymbol, session: TradingSession):
         """
-        Calculate daily return for a stock data point.
-        This is a simplified version - in reality you'd need previous day data.
+        Keep the memo only while the same stock and session are being analysed.
         """
-        # For now, return 0 - this would need more sophisticated calculation
-        # involving previous session's closing price
-        return 0.0
+        key = (stock.pk, session.pk)
+        if key != self._memo_key:
+            self.invalidate()
+            self._memo_key = key
+
+
+# Alert score weight by anomaly type importance; other types weigh 1.0
+ANOMALY_TYPE_WEIGHTS = {
+    'price_spike': 1.2,
+    'price_drop': 1.2,
+    'volume_spike': 0.9,
+    'resistance_break': 1.1,
+    'support_break': 1.1,
+    'pattern_break': 1.0
+}
 
 
 class SmartAlertEngine:
@@ -295,44 +517,75 @@ class SmartAlertEngine:
     AI-powered smart alert system with personalized scoring.
     """
     
+    # Score multiplier by severity (index 1-5); other severities weigh 1.0
+    SEVERITY_MULTIPLIERS = np.array([1.0, 0.5, 0.7, 1.0, 1.3, 1.5])
+    
+    # Anomaly types numbered in AnomalyAlert.ANOMALY_TYPES order; unknown types get the last index
+    TYPE_INDEX = {code: index for index, (code, _) in enumerate(AnomalyAlert.ANOMALY_TYPES)}
+    
+    # Combined severity x type multiplier, indexed [severity, type index]
+    MULTIPLIER_TABLE = np.outer(
+        SEVERITY_MULTIPLIERS,
+        [ANOMALY_TYPE_WEIGHTS.get(code, 1.0) for code in TYPE_INDEX] + [1.0]
+    )
+    
     def __init__(self):
         self.base_threshold = 0.7
+        # Watchlist symbols resolved to stock ids, once per engine
+        self._watchlist_ids = {}
         
     def calculate_alert_score(self, anomaly: AnomalyAlert, user_profile: Optional[Dict] = None) -> float:
         """
         Calculate personalized alert score based on anomaly and user preferences.
         """
-        base_score = float(anomaly.confidence_score)
-        
-        # Adjust based on severity
-        severity_multiplier = {1: 0.5, 2: 0.7, 3: 1.0, 4: 1.3, 5: 1.5}
-        score = base_score * severity_multiplier.get(anomaly.severity, 1.0)
-        
-        # Adjust based on anomaly type importance
-        type_weights = {
-            'price_spike': 1.2,
-            'price_drop': 1.2,
-            'volume_spike': 0.9,
-            'resistance_break': 1.1,
-            'support_break': 1.1,
-            'pattern_break': 1.0
-        }
-        score *= type_weights.get(anomaly.anomaly_type, 1.0)
+        return float(self.calculate_alert_scores([anomaly], user_profile)[0])
+    
+    def calculate_alert_scores(self, anomalies: List[AnomalyAlert], user_profile: Optional[Dict] = None) -> np.ndarray:
+        """
+        Calculate personalized alert scores for a batch of anomalies at once.
+        """
+        count = len(anomalies)
+        scores = np.fromiter((float(a.confidence_score) for a in anomalies), dtype=np.float64, count=count)
+        
+        # Adjust based on severity and anomaly type importance in one table lookup
+        severities = np.fromiter((a.severity for a in anomalies), dtype=np.int64, count=count)
+        severities[(severities < 1) | (severities > 5)] = 0
+        unknown_type = len(self.TYPE_INDEX)
+        types = np.fromiter(
+            (self.TYPE_INDEX.get(a.anomaly_type, unknown_type) for a in anomalies),
+            dtype=np.int64, count=count
+        )
+        scores *= self.MULTIPLIER_TABLE[severities, types]
         
         # User profile adjustments (if available)
         if user_profile:
-            # Adjust based on user's stock preferences
-            if anomaly.stock.symbol in user_profile.get('watchlist', []):
-                score *= 1.3
+            # Adjust based on user's stock preferences, matching on stock ids
+            watchlist = user_profile.get('watchlist', [])
+            if watchlist:
+                watchlist_ids = self._get_watchlist_ids(watchlist)
+                stock_ids = np.fromiter((a.stock_id for a in anomalies), dtype=np.int64, count=count)
+                scores[np.isin(stock_ids, watchlist_ids)] *= 1.3
             
             # Adjust based on user's risk tolerance
             risk_tolerance = user_profile.get('risk_tolerance', 'medium')
             if risk_tolerance == 'high':
-                score *= 0.8  # High risk users get fewer alerts
+                scores *= 0.8  # High risk users get fewer alerts
             elif risk_tolerance == 'low':
-                score *= 1.2  # Low risk users get more alerts
+                scores *= 1.2  # Low risk users get more alerts
         
-        return min(1.0, score)  # Cap at 1.0
+        return np.minimum(1.0, scores)  # Cap at 1.0
+    
+    def _get_watchlist_ids(self, watchlist) -> np.ndarray:
+        """
+        Stock ids of a watchlist's symbols, queried only the first time this engine sees the watchlist.
+        """
+        key = frozenset(watchlist)
+        if key not in self._watchlist_ids:
+            self._watchlist_ids[key] = np.fromiter(
+                StockSymbol.objects.filter(symbol__in=key).values_list('id', flat=True),
+                dtype=np.int64
+            )
+        return self._watchlist_ids[key]
     
     def should_send_alert(self, alert_score: float, user_settings: Optional[Dict] = None) -> bool:
         """
@@ -365,8 +618,9 @@ class PatternRecognizer:
         if len(recent_data) < 2:
             return patterns
             
-        current = recent_data[0]  # Most recent
-        previous = recent_data[1] if len(recent_data) > 1 else None
+        # Convert each candle's prices to floats once for all pattern checks
+        current = self._candle(recent_data[0])  # Most recent
+        previous = self._candle(recent_data[1]) if len(recent_data) > 1 else None
         
         if not current or not previous:
             return patterns
@@ -389,43 +643,49 @@ class PatternRecognizer:
         
         return patterns
     
-    def _get_ohlc_data(self, stock: StockSymbol, current_session: TradingSession, days: int = 10) -> List[StockData]:
+    def _get_ohlc_data(self, stock: StockSymbol, current_session: TradingSession, days: int = 10) -> List[Tuple]:
         """
         Get recent OHLC data for pattern analysis.
+        
+        Returns named rows with open_price, high_price, low_price and close_price,
+        newest session first.
         """
         end_date = current_session.date
         start_date = end_date - timedelta(days=days)
         
-        sessions = TradingSession.objects.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        ).order_by('-date')
-        
-        data = []
-        for session in sessions:
-            # Get the latest (most complete) data for each session
-            session_data = StockData.objects.filter(
-                stock=stock,
-                trading_session=session
-            ).order_by('-data_timestamp').first()
-            
-            if (session_data and session_data.open_price and 
-                session_data.high_price and session_data.low_price and session_data.close_price):
-                data.append(session_data)
-        
-        return data
+        # One query for the window; plain rows are enough for the price checks
+        rows = StockData.objects.filter(
+            stock=stock,
+            trading_session__date__range=(start_date, end_date)
+        ).order_by('-trading_session__date', '-data_timestamp').values_list(
+            'trading_session_id', 'open_price', 'high_price', 'low_price', 'close_price',
+            named=True
+        )
+        
+        # Get the latest (most complete) data for each session
+        latest = {}
+        for row in rows:
+            latest.setdefault(row.trading_session_id, row)
+        
+        return [
+            row for row in latest.values()
+            if row.open_price and row.high_price and row.low_price and row.close_price
+        ]
     
-    def _detect_doji(self, candle: StockData) -> Optional[Dict[str, Any]]:
+    def _candle(self, data) -> Optional[Tuple[float, float, float, float]]:
         """
-        Detect Doji candlestick pattern.
+        (open, high, low, close) of a record or row as floats, or None if any price is missing.
         """
-        if not all([candle.open_price, candle.close_price, candle.high_price, candle.low_price]):
+        prices = (data.open_price, data.high_price, data.low_price, data.close_price)
+        if not all(prices):
             return None
-            
-        open_price = float(candle.open_price or 0)
-        close_price = float(candle.close_price or 0)
-        high_price = float(candle.high_price or 0)
-        low_price = float(candle.low_price or 0)
+        return tuple(float(price) for price in prices)
+    
+    def _detect_doji(self, candle: Tuple[float, float, float, float]) -> Optional[Dict[str, Any]]:
+        """
+        Detect Doji candlestick pattern.
+        """
+        open_price, high_price, low_price, close_price = candle
         
         body_size = abs(close_price - open_price)
         total_range = high_price - low_price
@@ -451,17 +711,11 @@ class PatternRecognizer:
         
         return None
     
-    def _detect_hammer(self, candle: StockData) -> Optional[Dict[str, Any]]:
+    def _detect_hammer(self, candle: Tuple[float, float, float, float]) -> Optional[Dict[str, Any]]:
         """
         Detect Hammer candlestick pattern.
         """
-        if not all([candle.open_price, candle.close_price, candle.high_price, candle.low_price]):
-            return None
-            
-        open_price = float(candle.open_price or 0)
-        close_price = float(candle.close_price or 0)
-        high_price = float(candle.high_price or 0)
-        low_price = float(candle.low_price or 0)
+        open_price, high_price, low_price, close_price = candle
         
         body_top = max(open_price, close_price)
         body_bottom = min(open_price, close_price)
@@ -494,17 +748,13 @@ class PatternRecognizer:
         
         return None
     
-    def _detect_engulfing(self, current: StockData, previous: StockData) -> Optional[Dict[str, Any]]:
+    def _detect_engulfing(self, current: Tuple[float, float, float, float],
+                          previous: Tuple[float, float, float, float]) -> Optional[Dict[str, Any]]:
         """
         Detect Engulfing candlestick pattern.
         """
-        if not all([current.open_price, current.close_price, previous.open_price, previous.close_price]):
-            return None
-            
-        curr_open = float(current.open_price or 0)
-        curr_close = float(current.close_price or 0)
-        prev_open = float(previous.open_price or 0)
-        prev_close = float(previous.close_price or 0)
+        curr_open, _, _, curr_close = current
+        prev_open, _, _, prev_close = previous
         
         curr_body_top = max(curr_open, curr_close)
         curr_body_bottom = min(curr_open, curr_close)
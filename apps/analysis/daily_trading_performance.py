@@ -5,7 +5,12 @@ Specialized for intraday trading signals and hour-based evaluation
 from datetime import datetime, timedelta, time
 from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal
-from django.db.models import QuerySet, Avg, Count, Q, Sum, Case, When, DecimalField
+from django.db import connection
+from django.db.models import (
+    QuerySet, Avg, Count, Q, Sum, Max, Min, Case, When, F, Value, Window,
+    DecimalField, DurationField, ExpressionWrapper
+)
+from django.db.models.functions import ExtractHour, RowNumber
 from django.utils import timezone
 from dataclasses import dataclass
 
@@ -20,6 +25,43 @@ logger = logging.getLogger(__name__)
 MARKET_OPEN_TIME = time(9, 0)  # 9:00 AM
 MARKET_CLOSE_TIME = time(17, 0)  # 5:00 PM
 
+# Signal ROI in percent, computed in the database: the exit vs entry price move
+# in the signal's direction (buy: up, sell: down), 0 for other signal types
+SIGNAL_ROI = Case(
+    When(signal_type='buy', then=(F('outcome_price') - F('price_at_signal')) / F('price_at_signal') * Value(100)),
+    When(signal_type='sell', then=(F('price_at_signal') - F('outcome_price')) / F('price_at_signal') * Value(100)),
+    default=Value(0),
+    output_field=DecimalField()
+)
+
+# Signals that have an ROI (an exit price and a non-zero entry price)
+HAS_ROI = Q(outcome_price__isnull=False) & ~Q(outcome_price=0) & ~Q(price_at_signal=0)
+
+
+def _buy_target_stop_hit(target_price, stop_loss_price, high_price, low_price):
+    """(result, price) if a buy signal's target or stop loss was hit, else None"""
+    if target_price and high_price and high_price >= target_price:
+        return 'profitable', target_price
+    if stop_loss_price and low_price and low_price <= stop_loss_price:
+        return 'loss', stop_loss_price
+    return None
+
+
+def _sell_target_stop_hit(target_price, stop_loss_price, high_price, low_price):
+    """(result, price) if a sell signal's target or stop loss was hit, else None"""
+    if target_price and low_price and low_price <= target_price:
+        return 'profitable', target_price
+    if stop_loss_price and high_price and high_price >= stop_loss_price:
+        return 'loss', stop_loss_price
+    return None
+
+
+# Target/stop loss check by signal type; other types are only evaluated at the close
+TARGET_STOP_CHECKS = {
+    'buy': _buy_target_stop_hit,
+    'sell': _sell_target_stop_hit,
+}
+
 
 @dataclass
 class DailyTradingMetrics:
@@ -82,20 +124,30 @@ class DailyTradingPerformanceAnalyzer:
         except TradingSession.DoesNotExist:
             return self._empty_metrics()
         
-        # Base queryset for today's signals
+        # Base queryset for today's signals (only aggregated, so no rows are loaded)
         signals = TradingSignal.objects.filter(
             trading_session=trading_session,
             generated_by='daily_trading_system'
-        ).select_related('stock', 'trading_session')
+        )
         
         if stock_symbol:
             signals = signals.filter(stock__symbol=stock_symbol)
         
-        # Calculate basic counts
-        total_signals = signals.count()
-        profitable_signals = signals.filter(actual_outcome='profitable').count()
-        loss_signals = signals.filter(actual_outcome='loss').count()
-        pending_signals = signals.filter(actual_outcome='pending').count()
+        # Calculate basic counts and the average signal duration in one query
+        counts = signals.aggregate(
+            total=Count('id'),
+            profitable=Count('id', filter=Q(actual_outcome='profitable')),
+            loss=Count('id', filter=Q(actual_outcome='loss')),
+            pending=Count('id', filter=Q(actual_outcome='pending')),
+            avg_duration=Avg(
+                ExpressionWrapper(F('outcome_date') - F('created_at'), output_field=DurationField()),
+                filter=~Q(actual_outcome='pending') & Q(outcome_date__isnull=False)
+            )
+        )
+        total_signals = counts['total']
+        profitable_signals = counts['profitable']
+        loss_signals = counts['loss']
+        pending_signals = counts['pending']
         
         # Calculate win rate for completed signals
         completed_signals = profitable_signals + loss_signals
@@ -104,9 +156,8 @@ class DailyTradingPerformanceAnalyzer:
         # Calculate intraday returns
         returns_data = self._calculate_intraday_returns(signals)
         
-        # Calculate signal durations and target/stop hit rates
-        duration_data = self._calculate_signal_durations(signals)
-        target_stop_data = self._calculate_target_stop_hits(signals)
+        avg_duration = counts['avg_duration']
+        avg_duration_hours = avg_duration.total_seconds() / 3600 if avg_duration is not None else 0
         
         return DailyTradingMetrics(
             total_signals=total_signals,
@@ -118,9 +169,10 @@ class DailyTradingPerformanceAnalyzer:
             total_return_today=returns_data['total_return'],
             best_signal_return=returns_data['best_return'],
             worst_signal_return=returns_data['worst_return'],
-            avg_signal_duration_hours=duration_data['avg_duration_hours'],
-            signals_hit_target=target_stop_data['hit_target'],
-            signals_hit_stop=target_stop_data['hit_stop']
+            avg_signal_duration_hours=round(avg_duration_hours, 2),
+            # Profitable signals are assumed to have hit the target, losses the stop
+            signals_hit_target=profitable_signals,
+            signals_hit_stop=loss_signals
         )
     
     def get_hourly_performance_breakdown(
@@ -131,58 +183,60 @@ class DailyTradingPerformanceAnalyzer:
         if trading_date is None:
             trading_date = timezone.now().date()
         
-        breakdowns = []
+        # Signals of the trading hours (9 AM to 5 PM), by local hour of creation; the
+        # plain created_at range keeps the (generated_by, created_at) index usable
+        hour_signals = TradingSignal.objects.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(trading_date, MARKET_OPEN_TIME)),
+            created_at__lt=timezone.make_aware(datetime.combine(trading_date, MARKET_CLOSE_TIME)),
+            generated_by='daily_trading_system'
+        ).annotate(
+            hour=ExtractHour('created_at')
+        )
+        completed = ~Q(actual_outcome='pending')
         
-        # Analyze each trading hour (9 AM to 5 PM)
-        for hour in range(9, 17):
-            hour_start = timezone.make_aware(
-                datetime.combine(trading_date, time(hour, 0))
-            )
-            hour_end = timezone.make_aware(
-                datetime.combine(trading_date, time(hour, 59, 59))
+        # Counts and average return of every hour in one grouped query
+        hourly_stats = hour_signals.order_by('hour').values('hour').annotate(
+            signals=Count('id'),
+            completed=Count('id', filter=completed),
+            profitable=Count('id', filter=Q(actual_outcome='profitable')),
+            avg_return=Avg(SIGNAL_ROI, filter=completed & HAS_ROI)
+        )
+        
+        # Best and worst performer of every hour; ties go to the latest signal
+        performers = {}
+        ranked = hour_signals.filter(completed & HAS_ROI).annotate(
+            roi=SIGNAL_ROI,
+            best_rank=Window(
+                RowNumber(), partition_by=F('hour'), order_by=[F('roi').desc(), F('created_at').desc()]
+            ),
+            worst_rank=Window(
+                RowNumber(), partition_by=F('hour'), order_by=[F('roi').asc(), F('created_at').desc()]
             )
+        ).filter(Q(best_rank=1) | Q(worst_rank=1)).values_list(
+            'hour', 'roi', 'stock__symbol', 'best_rank', 'worst_rank'
+        )
+        for hour, roi, symbol, best_rank, worst_rank in ranked:
+            hour_performers = performers.setdefault(int(hour), {})
+            if best_rank == 1:
+                hour_performers['best'] = f"{symbol} ({float(roi):.2f}%)"
+            if worst_rank == 1:
+                hour_performers['worst'] = f"{symbol} ({float(roi):.2f}%)"
+        
+        breakdowns = []
+        for stats in hourly_stats:
+            hour = int(stats['hour'])
+            win_rate = (stats['profitable'] / stats['completed'] * 100) if stats['completed'] else 0
+            avg_return = float(stats['avg_return']) if stats['avg_return'] is not None else 0
+            hour_performers = performers.get(hour, {})
             
-            hour_signals = TradingSignal.objects.filter(
-                created_at__range=[hour_start, hour_end],
-                generated_by='daily_trading_system'
-            ).select_related('stock')
-            
-            if hour_signals.exists():
-                # Calculate hourly metrics
-                completed = hour_signals.exclude(actual_outcome='pending')
-                profitable = completed.filter(actual_outcome='profitable')
-                
-                win_rate = (profitable.count() / completed.count() * 100) if completed.exists() else 0
-                
-                # Calculate average return for this hour
-                returns = []
-                best_symbol = ""
-                worst_symbol = ""
-                best_return = float('-inf')
-                worst_return = float('inf')
-                
-                for signal in completed:
-                    roi = self._calculate_signal_roi(signal)
-                    if roi is not None:
-                        returns.append(roi)
-                        if roi > best_return:
-                            best_return = roi
-                            best_symbol = signal.stock.symbol
-                        if roi < worst_return:
-                            worst_return = roi
-                            worst_symbol = signal.stock.symbol
-                
-                avg_return = sum(returns) / len(returns) if returns else 0
-                
-                breakdown = HourlyPerformanceBreakdown(
-                    hour=hour,
-                    signals_generated=hour_signals.count(),
-                    win_rate=round(win_rate, 2),
-                    avg_return=round(avg_return, 2),
-                    best_performer=f"{best_symbol} ({best_return:.2f}%)" if best_symbol else "N/A",
-                    worst_performer=f"{worst_symbol} ({worst_return:.2f}%)" if worst_symbol else "N/A"
-                )
-                breakdowns.append(breakdown)
+            breakdowns.append(HourlyPerformanceBreakdown(
+                hour=hour,
+                signals_generated=stats['signals'],
+                win_rate=round(win_rate, 2),
+                avg_return=round(avg_return, 2),
+                best_performer=hour_performers.get('best', "N/A"),
+                worst_performer=hour_performers.get('worst', "N/A")
+            ))
         
         return breakdowns
     
@@ -202,14 +256,32 @@ class DailyTradingPerformanceAnalyzer:
             return {'updated': 0, 'errors': 0, 'processed': 0}
         
         # Get today's pending signals
-        pending_signals = TradingSignal.objects.filter(
+        pending_signals = list(TradingSignal.objects.filter(
             trading_session=trading_session,
             actual_outcome='pending',
             generated_by='daily_trading_system'
-        ).select_related('stock', 'trading_session')
+        ).only(
+            'stock_id', 'signal_type', 'price_at_signal', 'target_price', 'stop_loss_price',
+            'actual_outcome', 'outcome_price', 'outcome_date'
+        ).annotate(stock_symbol=F('stock__symbol')))
+        
+        # Latest price data of every stock with a pending signal, in one query
+        latest_data = StockData.objects.filter(
+            trading_session=trading_session,
+            stock_id__in={signal.stock_id for signal in pending_signals}
+        ).order_by('stock_id', '-data_timestamp').only('stock_id', 'high_price', 'low_price', 'close_price')
+        if connection.features.can_distinct_on_fields:
+            # DISTINCT ON returns one row per stock instead of the whole session
+            latest_data = latest_data.distinct('stock_id')
+        today_data = {}
+        for data in latest_data:
+            today_data.setdefault(data.stock_id, data)
         
-        current_time = timezone.now().time()
+        # Evaluation time is the same for the whole batch
+        now = timezone.now()
+        market_closed = now.time() >= MARKET_CLOSE_TIME
         
+        updated_signals = []
         for signal in pending_signals:
             try:
                 # For daily trading, evaluate based on:
@@ -217,96 +289,72 @@ class DailyTradingPerformanceAnalyzer:
                 # 2. Target/stop loss hits during the day
                 # 3. End of day evaluation if market is closed
                 
-                outcome = self._determine_intraday_outcome(signal, current_time)
+                outcome = self._determine_intraday_outcome(
+                    signal, today_data.get(signal.stock_id), now, market_closed
+                )
                 if outcome:
-                    signal.update_outcome(
-                        outcome['result'],
-                        outcome['price'],
-                        outcome['date']
-                    )
-                    updated_count += 1
-                    self.logger.info(f"Updated intraday signal outcome for {signal.stock.symbol}: {outcome['result']}")
+                    signal.actual_outcome = outcome['result']
+                    signal.outcome_price = outcome['price']
+                    signal.outcome_date = outcome['date']
+                    updated_signals.append(signal)
+                    self.logger.info(f"Updated intraday signal outcome for {signal.stock_symbol}: {outcome['result']}")
                     
             except Exception as e:
                 error_count += 1
                 self.logger.error(f"Error updating intraday signal {signal.pk}: {str(e)}")
         
+        # Save all outcomes in one batch
+        TradingSignal.objects.bulk_update(
+            updated_signals,
+            ['actual_outcome', 'outcome_price', 'outcome_date'],
+            batch_size=1000
+        )
+        updated_count = len(updated_signals)
+        
         return {
             'updated': updated_count,
             'errors': error_count,
-            'processed': pending_signals.count()
+            'processed': len(pending_signals)
         }
     
     def _determine_intraday_outcome(
         self,
         signal: TradingSignal,
-        current_time: time
+        today_data: Optional[StockData],
+        now: datetime,
+        market_closed: bool
     ) -> Optional[Dict[str, Any]]:
         """
-        Determine signal outcome within the same trading day.
+        Determine signal outcome within the same trading day from the stock's
+        latest price data for the session.
         """
         try:
-            # Get today's price data for this stock
-            today_data = StockData.objects.filter(
-                stock=signal.stock,
-                trading_session=signal.trading_session
-            ).first()
-            
             if not today_data:
                 return None
             
-            entry_price = signal.price_at_signal
-            target_price = signal.target_price
-            stop_loss_price = signal.stop_loss_price
-            
             # Check if target or stop loss was hit based on high/low
-            if signal.signal_type == 'buy':
-                # For buy signals
-                if target_price and today_data.high_price and today_data.high_price >= target_price:
-                    return {
-                        'result': 'profitable',
-                        'price': target_price,
-                        'date': timezone.now()
-                    }
-                elif stop_loss_price and today_data.low_price and today_data.low_price <= stop_loss_price:
-                    return {
-                        'result': 'loss',
-                        'price': stop_loss_price,
-                        'date': timezone.now()
-                    }
-            
-            elif signal.signal_type == 'sell':
-                # For sell signals  
-                if target_price and today_data.low_price and today_data.low_price <= target_price:
-                    return {
-                        'result': 'profitable',
-                        'price': target_price,
-                        'date': timezone.now()
-                    }
-                elif stop_loss_price and today_data.high_price and today_data.high_price >= stop_loss_price:
-                    return {
-                        'result': 'loss',
-                        'price': stop_loss_price,
-                        'date': timezone.now()
-                    }
+            check_hit = TARGET_STOP_CHECKS.get(signal.signal_type)
+            if check_hit:
+                hit = check_hit(
+                    signal.target_price, signal.stop_loss_price,
+                    today_data.high_price, today_data.low_price
+                )
+                if hit:
+                    return {'result': hit[0], 'price': hit[1], 'date': now}
             
             # If market is closed (after 5 PM), evaluate based on closing price
-            if current_time >= MARKET_CLOSE_TIME:
-                if today_data.close_price:
-                    close_price = today_data.close_price
-                    
-                    if signal.signal_type == 'buy':
-                        result = 'profitable' if close_price > entry_price else 'loss'
-                    elif signal.signal_type == 'sell':
-                        result = 'profitable' if close_price < entry_price else 'loss'
-                    else:
-                        result = 'break_even'
-                    
-                    return {
-                        'result': result,
-                        'price': close_price,
-                        'date': timezone.now()
-                    }
+            close_price = today_data.close_price
+            if market_closed and close_price:
+                entry_price = signal.price_at_signal
+                
+                if signal.signal_type == 'buy':
+                    result = 'profitable' if close_price > entry_price else 'loss'
+                elif signal.signal_type == 'sell':
+                    result = 'profitable' if close_price < entry_price else 'loss'
+                else:
+                    result = 'break_even'
+                
+                return {'result': result, 'price': close_price, 'date': now}
             
             return None
             
@@ -316,16 +364,14 @@ class DailyTradingPerformanceAnalyzer:
     
     def _calculate_intraday_returns(self, signals: QuerySet) -> Dict[str, Any]:
         """Calculate return metrics for intraday signals."""
-        returns = []
-        
-        completed_signals = signals.exclude(actual_outcome='pending')
-        
-        for signal in completed_signals:
-            roi = self._calculate_signal_roi(signal)
-            if roi is not None:
-                returns.append(roi)
+        # Signals without an ROI (no exit price or zero entry price) are left out
+        returns = signals.exclude(actual_outcome='pending').filter(HAS_ROI).aggregate(
+            total_return=Sum(SIGNAL_ROI),
+            best_return=Max(SIGNAL_ROI),
+            worst_return=Min(SIGNAL_ROI)
+        )
         
-        if not returns:
+        if returns['total_return'] is None:
             return {
                 'avg_return_per_hour': 0.0,
                 'total_return': 0.0,
@@ -333,12 +379,12 @@ class DailyTradingPerformanceAnalyzer:
                 'worst_return': 0.0
             }
         
-        total_return = sum(returns)
-        best_return = max(returns)
-        worst_return = min(returns)
+        total_return = float(returns['total_return'])
+        best_return = float(returns['best_return'])
+        worst_return = float(returns['worst_return'])
         
         # Calculate average return per hour (assuming 8-hour trading day)
-        avg_return_per_hour = total_return / 8 if returns else 0
+        avg_return_per_hour = total_return / 8
         
         return {
             'avg_return_per_hour': round(avg_return_per_hour, 2),
@@ -347,68 +393,6 @@ class DailyTradingPerformanceAnalyzer:
             'worst_return': round(worst_return, 2)
         }
     
-    def _calculate_signal_roi(self, signal: TradingSignal) -> Optional[float]:
-        """Calculate ROI for a trading signal."""
-        try:
-            if not signal.outcome_price or not signal.price_at_signal:
-                return None
-            
-            entry_price = float(signal.price_at_signal)
-            exit_price = float(signal.outcome_price)
-            
-            if entry_price == 0:
-                return None
-            
-            # Calculate ROI based on signal type
-            if signal.signal_type == 'buy':
-                roi = ((exit_price - entry_price) / entry_price) * 100
-            elif signal.signal_type == 'sell':
-                roi = ((entry_price - exit_price) / entry_price) * 100
-            else:
-                roi = 0
-            
-            return roi
-            
-        except (ValueError, ZeroDivisionError, AttributeError, TypeError):
-            return None
-    
-    def _calculate_signal_durations(self, signals: QuerySet) -> Dict[str, float]:
-        """Calculate average signal duration in hours."""
-        durations = []
-        
-        completed_signals = signals.exclude(actual_outcome='pending').exclude(outcome_date__isnull=True)
-        
-        for signal in completed_signals:
-            if signal.outcome_date:
-                duration = (signal.outcome_date - signal.created_at).total_seconds() / 3600  # hours
-                durations.append(duration)
-        
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        
-        return {
-            'avg_duration_hours': round(avg_duration, 2)
-        }
-    
-    def _calculate_target_stop_hits(self, signals: QuerySet) -> Dict[str, int]:
-        """Calculate how many signals hit target vs stop loss."""
-        hit_target = 0
-        hit_stop = 0
-        
-        completed_signals = signals.exclude(actual_outcome='pending')
-        
-        for signal in completed_signals:
-            if signal.actual_outcome == 'profitable':
-                # Assume profitable signals hit target
-                hit_target += 1
-            elif signal.actual_outcome == 'loss':
-                # Assume loss signals hit stop loss
-                hit_stop += 1
-        
-        return {
-            'hit_target': hit_target,
-            'hit_stop': hit_stop
-        }
-    
     def _empty_metrics(self) -> DailyTradingMetrics:
         """Return empty metrics when no data available."""
         return DailyTradingMetrics(
@@ -85,6 +85,13 @@ class Command(BaseCommand):
         total_patterns = 0
         processed_stocks = 0
 
+        # Detect and save anomalies for all stocks at once; failures are reported per stock below
+        anomaly_errors = {}
+        if not options['dry_run']:
+            anomaly_counts = anomaly_detector.process_session_anomalies(
+                trading_session, stocks, errors=anomaly_errors
+            )
+
         # Process each stock
         for stock in stocks:
             try:
@@ -93,13 +100,21 @@ class Command(BaseCommand):
 
                 # Detect anomalies
                 if not options['dry_run']:
-                    anomalies_count = anomaly_detector.process_stock_anomalies(stock, trading_session)
-                    total_anomalies += anomalies_count
+                    if stock.pk in anomaly_errors:
+                        raise anomaly_errors[stock.pk]
+                    total_anomalies += anomaly_counts.get(stock.pk, 0)
                 else:
                     # Dry run - just get anomalies without saving
-                    price_anomalies = anomaly_detector.detect_price_anomalies(stock, trading_session)
-                    volume_anomalies = anomaly_detector.detect_volume_anomalies(stock, trading_session)
-                    pattern_breaks = anomaly_detector.detect_pattern_breaks(stock, trading_session)
+                    threshold = options['confidence_threshold']
+                    price_anomalies = anomaly_detector.detect_price_anomalies(
+                        stock, trading_session, min_confidence=threshold
+                    )
+                    volume_anomalies = anomaly_detector.detect_volume_anomalies(
+                        stock, trading_session, min_confidence=threshold
+                    )
+                    pattern_breaks = anomaly_detector.detect_pattern_breaks(
+                        stock, trading_session, min_confidence=threshold
+                    )
                     
                     all_anomalies = price_anomalies + volume_anomalies + pattern_breaks
                     high_confidence_anomalies = [
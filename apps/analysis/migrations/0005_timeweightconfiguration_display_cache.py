@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis", "0004_timeweightconfiguration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timeweightconfiguration",
+            name="display_cache",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis", "0005_timeweightconfiguration_display_cache"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tradingsignal",
+            index=models.Index(fields=["trading_session", "generated_by", "actual_outcome"], name="analysis_tr_trading_c39dc0_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tradingsignal",
+            index=models.Index(fields=["generated_by", "created_at"], name="analysis_tr_generat_6f0597_idx"),
+        ),
+    ]
@@ -7,7 +7,10 @@ from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from django.conf import settings
+from django.core.cache import cache
 from apps.core.models import SoftDeleteModel, StockSymbol, TradingSession
 from apps.scrapers.models import StockData
 from typing import Any, Dict, List, Optional
@@ -827,6 +830,9 @@ class TradingSignal(SoftDeleteModel):
             models.Index(fields=['stock', 'signal_type', 'created_at']),
             models.Index(fields=['trading_session', 'signal_type']),
             models.Index(fields=['is_sent', 'created_at']),
+            # Daily trading performance filters
+            models.Index(fields=['trading_session', 'generated_by', 'actual_outcome']),
+            models.Index(fields=['generated_by', 'created_at']),
         ]
 
 
@@ -1051,6 +1057,10 @@ class PredictionResult(SoftDeleteModel):
         ordering = ['-created_at']
 
 
+ACTIVE_TIME_WEIGHT_CACHE_KEY = 'twc:active:{name}'
+ACTIVE_TIME_WEIGHT_CACHE_TIMEOUT = 3600  # 1 hour
+
+
 class TimeWeightConfiguration(models.Model):
     """
     Configuration for time-weighted news analysis for intraday trading
@@ -1061,6 +1071,12 @@ class TimeWeightConfiguration(models.Model):
         ('position', 'Position Trading'),
     ]
     
+    TRADING_STYLE_COLORS = {
+        'intraday': '#e74c3c',  # Red
+        'swing': '#3498db',     # Blue
+        'position': '#2ecc71'   # Green
+    }
+    
     name = models.CharField(max_length=100, unique=True)
     trading_style = models.CharField(max_length=20, choices=TRADING_STYLE_CHOICES)
     
@@ -1116,6 +1132,9 @@ class TimeWeightConfiguration(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Admin display strings, rebuilt on save()
+    display_cache = models.JSONField(default=dict, blank=True, editable=False)
+    
     class Meta:
         db_table = 'analysis_time_weight_configs'
         verbose_name = 'Time Weight Configuration'
@@ -1137,3 +1156,70 @@ class TimeWeightConfiguration(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.trading_style})"
+    
+    def build_display_cache(self) -> Dict[str, str]:
+        """Render the admin changelist display strings for this configuration"""
+        if self.half_life_minutes < 60:
+            half_life = f"{self.half_life_minutes}min"
+        elif self.half_life_minutes < 1440:
+            half_life = f"{self.half_life_minutes / 60:.1f}h"
+        else:
+            half_life = f"{self.half_life_minutes / 1440:.1f}d"
+        
+        return {
+            'trading_style': format_html(
+                '<span style="color: {}; font-weight: bold;">{}</span>',
+                self.TRADING_STYLE_COLORS.get(self.trading_style, '#95a5a6'),
+                self.get_trading_style_display()
+            ),
+            'half_life': half_life,
+            # Numeric-only snippets need no escaping
+            'weights': mark_safe(
+                f'<small>15m: {self.last_15min_weight:.0%} | 1h: {self.last_1hour_weight:.0%} | '
+                f'4h: {self.last_4hour_weight:.0%} | Today: {self.today_weight:.0%}</small>'
+            ),
+            'multipliers': mark_safe(
+                f'<small>Breaking: {self.breaking_news_multiplier:.1f}x | '
+                f'Market: {self.market_hours_multiplier:.1f}x | '
+                f'Pre: {self.pre_market_multiplier:.1f}x</small>'
+            ),
+            'threshold': f"{self.min_impact_threshold:.3f}",
+        }
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored name so a rename also drops the old cache entry
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+    
+    @classmethod
+    def get_active_cached(cls, name: str) -> Optional['TimeWeightConfiguration']:
+        """Active configuration with the given name (or None), cached between analysis runs"""
+        return cache.get_or_set(
+            ACTIVE_TIME_WEIGHT_CACHE_KEY.format(name=name),
+            lambda: cls.objects.filter(name=name, is_active=True).first(),
+            ACTIVE_TIME_WEIGHT_CACHE_TIMEOUT
+        )
+    
+    @staticmethod
+    def invalidate_active_cache(*names: str) -> None:
+        """Drop cached active configurations for the given names"""
+        cache.delete_many([ACTIVE_TIME_WEIGHT_CACHE_KEY.format(name=name) for name in names])
+    
+    def save(self, *args, **kwargs):
+        self.display_cache = self.build_display_cache()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'display_cache'}
+        super().save(*args, **kwargs)
+        
+        names = {self.name, getattr(self, '_loaded_name', None)} - {None}
+        self.invalidate_active_cache(*names)
+        self._loaded_name = self.name
+    
+    def delete(self, *args, **kwargs):
+        name = self.name
+        result = super().delete(*args, **kwargs)
+        self.invalidate_active_cache(name)
+        return result
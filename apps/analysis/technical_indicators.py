@@ -18,6 +18,13 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _round_decimal(value: float, places: int) -> Decimal:
+    """
+    Round a computed float to `places` decimals as a Decimal, without a str() round trip.
+    """
+    return Decimal.from_float(float(value)).quantize(Decimal(1).scaleb(-places))
+
+
 class TechnicalAnalysisEngine:
     """
     Main engine for calculating technical indicators.
@@ -144,7 +151,7 @@ class TechnicalAnalysisEngine:
                 
             results.append({
                 'timestamp': timestamp,
-                'value': Decimal(str(round(value, 4))),
+                'value': _round_decimal(value, 4),
                 'value_upper': None,
                 'value_lower': None,
                 'value_signal': None,
@@ -176,7 +183,7 @@ class TechnicalAnalysisEngine:
                 
             results.append({
                 'timestamp': timestamp,
-                'value': Decimal(str(round(value, 4))),
+                'value': _round_decimal(value, 4),
                 'value_upper': None,
                 'value_lower': None,
                 'value_signal': None,
@@ -208,7 +215,7 @@ class TechnicalAnalysisEngine:
                 
             results.append({
                 'timestamp': timestamp,
-                'value': Decimal(str(round(value, 4))),
+                'value': _round_decimal(value, 4),
                 'value_upper': None,
                 'value_lower': None,
                 'value_signal': None,
@@ -264,10 +271,10 @@ class TechnicalAnalysisEngine:
                 
             results.append({
                 'timestamp': timestamp,
-                'value': Decimal(str(round(macd_val, 6))),  # MACD line
+                'value': _round_decimal(macd_val, 6),  # MACD line
                 'value_upper': None,
                 'value_lower': None,
-                'value_signal': Decimal(str(round(signal_val, 6))),  # Signal line
+                'value_signal': _round_decimal(signal_val, 6),  # Signal line
             })
         
         logger.info(f"MACD calculated for {len(results)} periods (fast={fast_period}, slow={slow_period}, signal={signal_period})")
@@ -313,9 +320,9 @@ class TechnicalAnalysisEngine:
                 
             results.append({
                 'timestamp': timestamp,
-                'value': Decimal(str(round(sma_val, 4))),  # Middle band
-                'value_upper': Decimal(str(round(upper_val, 4))),  # Upper band
-                'value_lower': Decimal(str(round(lower_val, 4))),  # Lower band
+                'value': _round_decimal(sma_val, 4),  # Middle band
+                'value_upper': _round_decimal(upper_val, 4),  # Upper band
+                'value_lower': _round_decimal(lower_val, 4),  # Lower band
                 'value_signal': None,
             })
         
@@ -22,11 +22,8 @@ class NewsTimeWeightAnalyzer:
     """
     
     def __init__(self, config_name: str = "intraday_default"):
-        try:
-            self.config = TimeWeightConfiguration.objects.get(
-                name=config_name, is_active=True
-            )
-        except TimeWeightConfiguration.DoesNotExist:
+        self.config = TimeWeightConfiguration.get_active_cached(config_name)
+        if self.config is None:
             # Create default intraday config if not exists
             self.config = self._create_default_intraday_config()
     
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StockSymbol, TradingSession
+from .models import StockSymbol, TradingSession, Industry
 
 
 @admin.register(StockSymbol)
@@ -34,3 +34,16 @@ class TradingSessionAdmin(admin.ModelAdmin):
     list_filter = ['is_trading_day', 'is_active']
     ordering = ['-date']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(Industry)
+class IndustryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'parent_industry', 'volatility_level', 'is_cyclical']
+    list_filter = ['volatility_level', 'is_cyclical']
+    search_fields = ['^name', '^code']  # prefix lookups for autocomplete widgets
+    ordering = ['name']
+    readonly_fields = ['created_at', 'updated_at']
+    
+    def get_queryset(self, request):
+        # __str__ includes the parent industry name
+        return super().get_queryset(request).select_related('parent_industry')
@@ -8,3 +8,9 @@ class CoreConfig(AppConfig):
     def ready(self):
         # Import Celery tasks to ensure they are registered
         import apps.core.tasks
+        
+        # Move log handler I/O off request threads (opt-in, off by default)
+        from django.conf import settings
+        if settings.USE_QUEUE_LOGGING:
+            from apps.core.log_queue import start_queue_logging
+            start_queue_logging()
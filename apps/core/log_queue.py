@@ -0,0 +1,61 @@
+"""
+Non-blocking logging (opt-in with USE_QUEUE_LOGGING=True)
+
+start_queue_logging() swaps the handlers of every logger configured in
+settings.LOGGING for a QueueHandler, and runs the original handlers on
+background QueueListener threads, so request threads only enqueue records.
+Loggers that share the same handlers share one queue and listener.
+"""
+
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+_routes = []  # (QueueHandler, original handlers)
+_listeners = []
+
+
+def _start_listeners():
+    """Give every route a fresh queue and listener thread"""
+    _listeners.clear()
+    for queue_handler, handlers in _routes:
+        queue_handler.queue = queue.SimpleQueue()
+        listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+
+
+def stop_queue_logging():
+    """Flush queued records and stop the listener threads"""
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+
+def start_queue_logging():
+    """Route the configured loggers through queues; safe to call more than once"""
+    if _routes:
+        return
+    
+    queue_handlers = {}
+    for name in settings.LOGGING.get('loggers', {}):
+        logger = logging.getLogger(name)
+        handlers = tuple(logger.handlers)
+        if not handlers:
+            continue
+        
+        if handlers not in queue_handlers:
+            queue_handlers[handlers] = QueueHandler(queue.SimpleQueue())
+            _routes.append((queue_handlers[handlers], handlers))
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handlers[handlers])
+    
+    _start_listeners()
+    atexit.register(stop_queue_logging)
+    # Listener threads do not survive a fork (Celery prefork, gunicorn --preload)
+    os.register_at_fork(after_in_child=_start_listeners)
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_stocksymbol_bankier_symbol"),
+    ]
+
+    operations = [
+        # pg_trgm backs the users_full_name_trgm_idx index and trigram_similar searches
+        TrigramExtension(),
+    ]
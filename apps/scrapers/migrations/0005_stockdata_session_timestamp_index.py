@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scrapers", "0004_change_stockdata_unique_constraint"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="stockdata",
+            index=models.Index(fields=["stock", "trading_session", "-data_timestamp"], name="idx_stockdata_sess_ts"),
+        ),
+    ]
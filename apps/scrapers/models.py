@@ -352,6 +352,10 @@ class StockData(SoftDeleteModel):
         verbose_name_plural = 'Stock Data'
         unique_together = ['stock', 'data_timestamp', 'source']
         ordering = ['-data_timestamp', 'stock__symbol']
+        indexes = [
+            # Latest record per (stock, session) lookups
+            models.Index(fields=['stock', 'trading_session', '-data_timestamp'], name='idx_stockdata_sess_ts'),
+        ]
 
 
 class ScrapingLog(models.Model):
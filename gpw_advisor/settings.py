@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     
     # Third party apps
     "rest_framework",
@@ -63,6 +64,9 @@ INSTALLED_APPS = [
     "apps.news.apps.NewsConfig",
 ]
 
+# Settings that only apply once the accounts app is installed
+ACCOUNTS_APP_ENABLED = "apps.accounts.apps.AccountsConfig" in INSTALLED_APPS
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -72,6 +76,9 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+if ACCOUNTS_APP_ENABLED:
+    # Session activity heartbeat, flushed by the flush-session-activity beat entry
+    MIDDLEWARE.append("apps.accounts.middleware.SessionActivityMiddleware")
 
 ROOT_URLCONF = "gpw_advisor.urls"
 
@@ -111,9 +118,35 @@ DATABASES = {
     }
 }
 
+# Redis (Celery broker/results and direct clients such as apps.accounts.heartbeat)
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+
+# Cache: per-process LocMem by default. Setting REDIS_URL explicitly opts in to a
+# Redis cache shared across web and Celery workers, so invalidations reach every process
+if config('REDIS_URL', default=''):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Auth User Model
 AUTH_USER_MODEL = 'users.User'
 
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',
+]
+if ACCOUNTS_APP_ENABLED:
+    # Accept either username or email on the accounts login
+    AUTHENTICATION_BACKENDS.insert(0, 'apps.accounts.backends.EmailOrUsernameModelBackend')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -163,8 +196,8 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Celery Configuration
-CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -209,6 +242,14 @@ CELERY_BEAT_SCHEDULE = {
         }
     },
 }
+if ACCOUNTS_APP_ENABLED:
+    CELERY_BEAT_SCHEDULE['flush-session-activity'] = {
+        'task': 'apps.accounts.tasks.flush_session_activity_task',
+        'schedule': 60.0,  # Run every 60 seconds (1 minute)
+        'options': {
+            'expires': 50.0,  # Task expires after 50 seconds if not picked up
+        }
+    }
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
 # Telegram Bot Configuration
@@ -239,6 +280,10 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 # Use console logging in Docker environment, file logging in development
 USE_FILE_LOGGING = config('USE_FILE_LOGGING', default=False, cast=bool)
 
+# Opt-in: hand log records to background listener threads (see apps.core.log_queue).
+# Off by default; when on, every process swaps its configured handlers for queues.
+USE_QUEUE_LOGGING = config('USE_QUEUE_LOGGING', default=False, cast=bool)
+
 if USE_FILE_LOGGING:
     # File-based logging for development
     LOGGING = {